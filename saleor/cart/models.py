@@ -5,14 +5,15 @@ from uuid import uuid4
 
 from django.conf import settings
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, IntegerField, Value, When
 from django.urls import reverse
 from django.utils.encoding import smart_str
 from django.utils.timezone import now
 from django_prices.models import PriceField
 from jsonfield import JSONField
 from prices import Price
-from satchless.item import ItemLine, ItemList, partition
+from satchless.item import InsufficientStock, ItemLine, ItemList, partition
 
 from . import CartStatus, logger
 
@@ -230,6 +231,72 @@ class Cart(models.Model):
             cart_line.save(update_fields=['quantity'])
         self.update_quantity()
 
+    def update_lines(self, changes, check_quantity=True):
+        """Apply many changes of quantities of product variants at once.
+
+        `changes` are `(variant, quantity, replace)` triples applied in order
+        with the semantics of `add`. Stock of all variants is checked with
+        a single query before anything is written, lines are then created,
+        updated and deleted with a query each, and the cart quantity is
+        recalculated once.
+        """
+        # pylint: disable=cyclic-import
+        from ..product.models import ProductVariant
+
+        variants = {}
+        for variant, dummy, dummy in changes:
+            variants[variant.pk] = variant
+        if not variants:
+            return
+        with transaction.atomic():
+            lines = {
+                line.variant_id: line
+                for line in self.lines.filter(variant__in=list(variants))}
+            quantities = {
+                pk: line.quantity for pk, line in lines.items()}
+            for variant, quantity, replace in changes:
+                new_quantity = quantity
+                if not replace:
+                    new_quantity += quantities.get(variant.pk, 0)
+                if new_quantity < 0:
+                    raise ValueError(
+                        '%r is not a valid quantity (results in %r)' % (
+                            quantity, new_quantity))
+                quantities[variant.pk] = new_quantity
+            if check_quantity:
+                available = dict(ProductVariant.objects.filter(
+                    pk__in=list(variants)).values_list(
+                        'pk', 'quantity_available'))
+                for pk, quantity in quantities.items():
+                    if quantity > available.get(pk, 0):
+                        raise InsufficientStock(variants[pk])
+            self._save_lines(lines, quantities)
+        # Lines prefetched before the changes are no longer valid
+        getattr(self, '_prefetched_objects_cache', {}).pop('lines', None)
+        self.update_quantity()
+
+    def _save_lines(self, lines, quantities):
+        new_lines = [
+            CartLine(cart=self, variant_id=pk, quantity=quantity, data={})
+            for pk, quantity in quantities.items()
+            if quantity and pk not in lines]
+        changed = {
+            lines[pk].pk: quantity for pk, quantity in quantities.items()
+            if quantity and pk in lines and lines[pk].quantity != quantity}
+        removed = [
+            lines[pk].pk for pk, quantity in quantities.items()
+            if not quantity and pk in lines]
+        if new_lines:
+            CartLine.objects.bulk_create(new_lines)
+        if changed:
+            CartLine.objects.filter(pk__in=list(changed)).update(
+                quantity=Case(
+                    *[When(pk=pk, then=Value(quantity))
+                      for pk, quantity in changed.items()],
+                    output_field=IntegerField()))
+        if removed:
+            CartLine.objects.filter(pk__in=removed).delete()
+
     def partition(self):
         """Split the card into a list of groups for shipping."""
         grouper = (
@@ -10,7 +10,7 @@ from prices import PriceRange
 from satchless.item import InsufficientStock
 
 from . import CartStatus
-from ..core.utils import to_local_currency
+from ..core.utils import to_local_currencies
 from ..core.utils.billing import price_range_get_taxed
 from .models import Cart
 
@@ -49,13 +49,17 @@ def token_is_valid(token):
 
 
 def remove_unavailable_variants(cart):
-    """Remove any unavailable items from cart."""
+    """Remove any unavailable items from cart.
+
+    Quantities exceeding the stock available are lowered to it, with all
+    lines changed at once.
+    """
+    changes = []
     for line in cart.lines.all():
-        try:
-            cart.add(line.variant, quantity=line.quantity, replace=True)
-        except InsufficientStock as e:
-            quantity = e.item.get_stock_quantity()
-            cart.add(line.variant, quantity=quantity, replace=True)
+        quantity = line.variant.get_stock_quantity()
+        if line.quantity > quantity:
+            changes.append((line.variant, quantity, True))
+    cart.update_lines(changes, check_quantity=False)
 
 
 def get_product_variants_and_prices(cart, product):
@@ -218,13 +222,12 @@ def get_cart_data(cart, shipping_range, currency, discounts):
     local_total_with_shipping = None
     if cart:
         cart_total = cart.get_total(discounts=discounts)
-        local_cart_total = to_local_currency(cart_total, currency)
         shipping_required = cart.is_shipping_required()
         total_with_shipping = PriceRange(cart_total)
         if shipping_required and shipping_range:
             total_with_shipping = shipping_range + cart_total
-        local_total_with_shipping = to_local_currency(
-            total_with_shipping, currency)
+        local_cart_total, local_total_with_shipping = to_local_currencies(
+            (cart_total, total_with_shipping), currency)
 
     return {
         'cart_total': cart_total,
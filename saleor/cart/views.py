@@ -179,8 +179,10 @@ def get_cart(request, variant_quantity):
     if request.POST:
         cart = get_or_create_cart_from_request(request)
 
-        for variant, quantity, total_price in tuple(cart_iterator):
-            cart.add(variant, quantity, replace=True, check_quantity=False)
+        cart.update_lines([
+            (variant, quantity, True)
+            for variant, quantity, dummy in cart_iterator],
+            check_quantity=False)
 
         response = redirect(reverse('cart:index'))
 
@@ -14,7 +14,8 @@ from ..cart.utils import get_or_empty_db_cart
 from ..core import analytics
 from ..discount.models import NotApplicable, Voucher
 from ..discount.utils import increase_voucher_usage
-from ..order.models import Order
+from ..order.allocation import allocate_lines
+from ..order.models import DeliveryGroup, Order
 from ..shipping.models import ANY_COUNTRY, ShippingMethodCountry
 from ..userprofile.models import Address
 from ..userprofile.utils import store_user_address
@@ -327,27 +328,25 @@ class Checkout:
             order_data['discount_amount'] = discount.amount
             order_data['discount_name'] = discount.name
 
-        order = Order.objects.create(**order_data)
-        min_days = []
-        max_days = []
-
-        for line in self.cart.partition():
-            for cart_line in line:
-                product = cart_line.variant.product
-                min_, max_ = product.availability_within_days
-                if min_:
-                    min_days.append(min_)
-                if max_:
-                    max_days.append(max_)
+        order = Order(**order_data)
+        order.create_delivery_dates(*self._get_delivery_days())
+        order.save()
 
-            shipping_required = line.is_shipping_required()
+        groups, entries = [], []
+        for partition in self.cart.partition():
+            shipping_required = partition.is_shipping_required()
             shipping_method_name = (
                 smart_text(self.shipping_method) if shipping_required
                 else None)
-            group = order.groups.create(
-                shipping_method_name=shipping_method_name)
-            group.process(line, self.cart.discounts)
-            group.save()
+            group = DeliveryGroup(
+                order=order, shipping_method_name=shipping_method_name)
+            groups.append(group)
+            entries.extend(
+                (group, cart_line.variant, cart_line.get_quantity())
+                for cart_line in partition)
+        # Primary keys of the groups are needed by their lines
+        DeliveryGroup.objects.bulk_create(groups)
+        allocate_lines(entries, self.cart.discounts)
 
         if voucher is not None:
             increase_voucher_usage(voucher)
@@ -355,11 +354,25 @@ class Checkout:
         if self.note is not None and self.note:
             order.notes.create(user=order.user, content=self.note)
 
-        order.create_delivery_dates(min_days, max_days)
-        order.save()
-
         return order
 
+    def _get_delivery_days(self):
+        """Return availability bounds in days of the ordered products.
+
+        Stock of the products is read from the cart, which prefetches it
+        when loaded for checkout views.
+        """
+        min_days = []
+        max_days = []
+        for cart_line in self.cart.lines.all():
+            product = cart_line.variant.product
+            min_, max_ = product.availability_within_days
+            if min_:
+                min_days.append(min_)
+            if max_:
+                max_days.append(max_)
+        return min_days, max_days
+
     def _get_voucher(self, vouchers=None):
         voucher_code = self.voucher_code
         if voucher_code is not None:
@@ -416,7 +429,9 @@ def load_checkout(view):
     # FIXME: behave like middleware and assign checkout and cart to request
     # instead of changing the view signature
     @wraps(view)
-    @get_or_empty_db_cart(Cart.objects.for_display())
+    @get_or_empty_db_cart(Cart.objects.for_display().prefetch_related(
+        # Stock of ordered products gives bounds of delivery dates
+        'lines__variant__product__variants__stock'))
     def func(request, cart):
         try:
             session_data = request.session[STORAGE_SESSION_KEY]
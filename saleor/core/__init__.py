@@ -1,3 +1,4 @@
+from django.apps import AppConfig
 from django.conf import settings
 from django.core.checks import register, Warning
 
@@ -5,6 +6,17 @@ TOKEN_PATTERN = ('(?P<token>[0-9a-z]{8}-[0-9a-z]{4}-[0-9a-z]{4}-[0-9a-z]{4}'
                  '-[0-9a-z]{12})')
 
 
+class CoreAppConfig(AppConfig):
+    name = 'saleor.core'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+        from django_prices_openexchangerates.models import ConversionRate
+        from .signals import invalidate_exchange_rates
+        post_save.connect(invalidate_exchange_rates, sender=ConversionRate)
+        post_delete.connect(invalidate_exchange_rates, sender=ConversionRate)
+
+
 @register()
 def check_session_caching(app_configs, **kwargs):  # pragma: no cover
     errors = []
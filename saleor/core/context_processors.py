@@ -1,6 +1,6 @@
 from django.conf import settings
 
-from ..product.models import Category
+from ..product.categories import get_category_tree
 
 
 def get_setting_as_dict(name, short_name=None):
@@ -20,7 +20,7 @@ def default_currency(request):
 # request is a required parameter
 # pylint: disable=W0613
 def categories(request):
-    return {'categories': Category.tree.root_nodes()}
+    return {'categories': get_category_tree().roots}
 
 
 def search_enabled(request):
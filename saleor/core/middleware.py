@@ -2,11 +2,12 @@ import logging
 
 from django.conf import settings
 from django.contrib.sites.models import Site
+from django.utils.functional import SimpleLazyObject
 from django.utils.translation import get_language
 from django_countries.fields import Country
 
 from . import analytics
-from ..discount.models import Sale
+from ..discount.utils import get_sale_index
 from .utils import get_client_ip, get_country_by_ip, get_currency_for_country
 
 logger = logging.getLogger(__name__)
@@ -29,11 +30,13 @@ def google_analytics(get_response):
 
 
 def discounts(get_response):
-    """Assign active discounts to `request.discounts`."""
+    """Assign active discounts to `request.discounts`.
+
+    Sales are read from a snapshot shared by all requests served by the
+    process and only loaded when a view needs them.
+    """
     def middleware(request):
-        discounts = Sale.objects.all()
-        discounts = discounts.prefetch_related('products', 'categories')
-        request.discounts = discounts
+        request.discounts = SimpleLazyObject(get_sale_index)
         return get_response(request)
 
     return middleware
@@ -0,0 +1,6 @@
+from .utils import exchange_rates
+
+
+def invalidate_exchange_rates(sender, **kwargs):
+    """Invalidate the exchange rates snapshot when rates are updated."""
+    exchange_rates.invalidate_exchange_rates()
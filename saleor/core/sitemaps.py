@@ -1,13 +1,20 @@
 from django.contrib.sitemaps import Sitemap
 
 from ..page.models import Page
+from ..page.utils import PAGES_VERSION_NAME
+from ..product.categories import CATEGORIES_VERSION_NAME
 from ..product.models import Category, Product
+from ..product.utils import LISTINGS_VERSION_NAME
+
+# Versions of data listed by the sitemaps, used as their validators
+SITEMAP_VERSION_NAMES = (
+    LISTINGS_VERSION_NAME, CATEGORIES_VERSION_NAME, PAGES_VERSION_NAME)
 
 
 class ProductSitemap(Sitemap):
 
     def items(self):
-        return Product.objects.only('id', 'name').order_by('-id')
+        return Product.objects.only('id', 'name', 'slug').order_by('-id')
 
 
 class CategorySitemap(Sitemap):
@@ -11,11 +11,10 @@ from django.http import Http404
 from django.utils.encoding import iri_to_uri, smart_text
 from django_countries import countries
 from django_countries.fields import Country
-from django_prices_openexchangerates import exchange_currency
 from geolite2 import geolite2
-from prices import PriceRange
 
 from ...userprofile.models import User
+from .exchange_rates import exchange_prices
 
 georeader = geolite2.reader()
 
@@ -88,18 +87,22 @@ def get_paginator_items(items, paginate_by, page_number):
 
 
 def to_local_currency(price, currency):
+    return to_local_currencies([price], currency)[0]
+
+
+def to_local_currencies(prices, currency):
+    """Convert many prices or price ranges to the local currency at once.
+
+    Returns `None` in place of prices that are already in that currency or
+    cannot be converted.
+    """
+    prices = list(prices)
     if not settings.OPENEXCHANGERATES_API_KEY:
-        return None
-    if isinstance(price, PriceRange):
-        from_currency = price.min_price.currency
-    else:
-        from_currency = price.currency
-    if currency != from_currency:
-        try:
-            return exchange_currency(price, currency)
-        except ValueError:
-            pass
-    return None
+        return [None] * len(prices)
+    converted = exchange_prices(prices, currency)
+    return [
+        None if local_price is price else local_price
+        for price, local_price in zip(prices, converted)]
 
 
 def get_user_shipping_country(request):
@@ -1,46 +1,103 @@
-from decimal import Decimal
-from typing import Union, Tuple
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
+from typing import Iterable, List, Optional, Union, Tuple
 
 from prices import Price, PriceRange
 
 from TaxRate import RATES, CountryTax
 from saleor import settings
 
+CENTS = Decimal('0.01')
+TAXED_AMOUNTS_CACHE_SIZE = 4096
 
-def _get_taxed(rate: float, price: Price) -> Decimal:
-    res = Decimal(float(price) * (1 + rate))
-    return res
 
+@lru_cache(maxsize=None)
+def get_tax_rates() -> dict:
+    """Return country codes mapped to tax rates, resolved once."""
+    rates = {}
+    for code, rate in RATES.items():
+        if isinstance(rate, CountryTax):
+            rate = rate.rate
+        rates[code] = rate
+    return rates
 
-def price_range_get_taxed(price_range):
+
+def get_tax_rate(code) -> float:
+    rates = get_tax_rates()
+    rate = rates.get(code, None)
+    if not rate:
+        rate = rates.get(settings.DEFAULT_TAX_RATE_COUNTRY,
+                         settings.FALLBACK_TAX_RATE)
+    return rate
+
+
+@lru_cache(maxsize=None)
+def get_decimal_tax_rate(code) -> Decimal:
+    return Decimal(str(get_tax_rate(code)))
+
+
+@lru_cache(maxsize=TAXED_AMOUNTS_CACHE_SIZE)
+def get_taxed_amount(code, amount: Decimal) -> Decimal:
+    """Return the amount with the tax of the given country, in cents."""
+    taxed = amount * (1 + get_decimal_tax_rate(code))
+    return taxed.quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+def clear_tax_cache():
+    """Forget resolved rates and taxed amounts, e.g. after updating rates."""
+    get_tax_rates.cache_clear()
+    get_decimal_tax_rate.cache_clear()
+    get_taxed_amount.cache_clear()
+
+
+def _to_decimal(amount) -> Decimal:
+    if isinstance(amount, Decimal):
+        return amount
+    return Decimal(str(amount))
+
+
+def get_taxed_amounts(
+        amounts: Iterable[Decimal], code=None) -> List[Decimal]:
+    return [get_taxed_amount(code, _to_decimal(amount)) for amount in amounts]
+
+
+def get_taxed_prices(
+        prices: Iterable[Price], code=None) -> List[Price]:
+    """Return prices with the tax of the given country applied."""
+    return [
+        Price(net=price.gross, gross=get_taxed_amount(code, price.gross),
+              currency=price.currency)
+        for price in prices]
+
+
+def price_range_get_taxed(
+        price_range: Optional[PriceRange], code=None) -> Optional[PriceRange]:
     if price_range:
-        _price = (
-            get_tax_price(total=price_range.min_price)[0],
-            get_tax_price(total=price_range.max_price)[0])
-        price_range = PriceRange(*_price)
-        return price_range
+        return PriceRange(*get_taxed_prices(
+            (price_range.min_price, price_range.max_price), code))
+    return None
+
+
+def price_ranges_get_taxed(
+        price_ranges: Iterable[Optional[PriceRange]],
+        code=None) -> List[Optional[PriceRange]]:
+    return [
+        price_range_get_taxed(price_range, code)
+        for price_range in price_ranges]
 
 
 def get_tax_country_code(code,
                          price: Union[Price, float]) -> Tuple[Price, float]:
-    rate = RATES.get(code, None)
-    if not rate:
-        rate = RATES.get(settings.DEFAULT_TAX_RATE_COUNTRY,
-                         settings.FALLBACK_TAX_RATE)
-
-    if isinstance(rate, CountryTax):
-        rate = rate.rate
+    rate = get_tax_rate(code)
 
     if type(price) is Price:
         gross = price.gross
         currency = price.currency
     else:
-        gross = price
+        gross = _to_decimal(price)
         currency = settings.DEFAULT_CURRENCY
 
-    taxed = _get_taxed(rate, gross)
-
-    p = Price(gross=Decimal(taxed),
+    p = Price(gross=get_taxed_amount(code, gross),
               net=gross, currency=currency)
 
     return p, rate
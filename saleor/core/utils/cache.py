@@ -0,0 +1,91 @@
+from threading import Lock
+from time import monotonic
+from uuid import uuid4
+
+from django.core.cache import cache
+
+VERSION_KEY_PREFIX = 'version:'
+
+
+def get_version_key(name):
+    return VERSION_KEY_PREFIX + name
+
+
+def get_cache_version(name):
+    """Return the current version stored under `name` in the shared cache.
+
+    A missing version is initialized so that all processes agree on it.
+    """
+    key = get_version_key(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid4().hex, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def get_cache_versions(names):
+    """Return current versions stored under many names, keyed by names."""
+    keys = {get_version_key(name): name for name in names}
+    versions = {
+        keys[key]: version
+        for key, version in cache.get_many(list(keys)).items()}
+    for name in keys.values():
+        if name not in versions:
+            versions[name] = get_cache_version(name)
+    return versions
+
+
+def bump_cache_version(name):
+    """Invalidate everything depending on the version stored under `name`."""
+    version = uuid4().hex
+    cache.set(get_version_key(name), version, timeout=None)
+    return version
+
+
+class ProcessSnapshot:
+    """A value built once per process and shared between requests.
+
+    The value is produced by calling `loader` on first use and reused until
+    the version stored under `name` in the shared cache changes, which
+    allows to invalidate the snapshots of all worker processes at once.
+    When `timeout` is given, the value is also rebuilt once it is older than
+    that many seconds.
+    """
+
+    def __init__(self, name, loader, timeout=None):
+        self.name = name
+        self.loader = loader
+        self.timeout = timeout
+        self._lock = Lock()
+        self._version = None
+        self._value = None
+        self._loaded_at = None
+
+    def _is_stale(self, version):
+        if self._version is None or self._version != version:
+            return True
+        if self.timeout is None:
+            return False
+        return monotonic() - self._loaded_at > self.timeout
+
+    def get(self):
+        version = get_cache_version(self.name)
+        if self._is_stale(version):
+            with self._lock:
+                if self._is_stale(version):
+                    self._value = self.loader()
+                    self._version = version
+                    self._loaded_at = monotonic()
+        return self._value
+
+    def invalidate(self):
+        """Force all processes to rebuild the snapshot on next use."""
+        bump_cache_version(self.name)
+
+    def clear(self):
+        """Drop the value held by the current process."""
+        with self._lock:
+            self._version = None
+            self._value = None
+            self._loaded_at = None
@@ -0,0 +1,59 @@
+"""Conditional GET support of storefront pages."""
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.views.decorators.http import condition
+
+from .page_cache import get_page_digest, get_version_names
+
+
+def is_revalidation_allowed(request):
+    """Return whether validators can be sent for the page requested.
+
+    Pages showing pending messages are never answered from client caches.
+    """
+    return (
+        request.method in ('GET', 'HEAD') and not len(get_messages(request)))
+
+
+def is_personalized(request):
+    """Return whether pages requested show data of the visitor's own."""
+    # pylint: disable=cyclic-import
+    from ...cart.utils import COOKIE_NAME
+
+    return request.user.is_authenticated or COOKIE_NAME in request.COOKIES
+
+
+def get_visitor_parts(request):
+    """Return data of the visitor rendered on every storefront page.
+
+    These are the user, the CSRF cookie used by the page forms and the number
+    of items in the cart. The cart is only queried when there may be one.
+    """
+    # pylint: disable=cyclic-import
+    from ...cart.context_processors import cart_counter
+
+    quantity = 0
+    if is_personalized(request):
+        quantity = cart_counter(request)['cart_counter']
+    return [
+        request.user.pk or '',
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''), quantity]
+
+
+def conditional_page(*version_names, per_visitor=True):
+    """Decorate a view to answer revalidation requests with entity tags.
+
+    The entity tag of a page is derived from the cache versions named by
+    `version_names`, which follow the rules of `cache_anonymous_page`, and
+    from data of the visitor unless `per_visitor` is disabled. Requests
+    matching the entity tag are answered with 304 responses without calling
+    the view.
+    """
+    def get_etag(request, *args, **kwargs):
+        if not is_revalidation_allowed(request):
+            return None
+        extra_parts = get_visitor_parts(request) if per_visitor else ()
+        return get_page_digest(
+            request, get_version_names(version_names, kwargs), extra_parts)
+
+    return condition(etag_func=get_etag)
@@ -0,0 +1,101 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django_prices_openexchangerates import BASE_CURRENCY
+from django_prices_openexchangerates import models as exchange_models
+from prices import Price, PriceRange
+
+from .cache import ProcessSnapshot
+
+EXCHANGE_RATES_TTL = getattr(settings, 'OPENEXCHANGERATES_CACHE_TTL', 60 * 60)
+
+
+def load_exchange_rates():
+    rates = exchange_models.get_rates(
+        exchange_models.ConversionRate.objects.all())
+    return {
+        currency: Decimal(conversion_rate.rate)
+        for currency, conversion_rate in rates.items()}
+
+
+exchange_rates_snapshot = ProcessSnapshot(
+    'exchange_rates', load_exchange_rates, timeout=EXCHANGE_RATES_TTL)
+
+
+def get_exchange_rates():
+    """Return conversion rates from the base currency, keyed by currency."""
+    rates = exchange_rates_snapshot.get()
+    if not rates:
+        # Rates were never fetched, there is nothing worth keeping around
+        exchange_rates_snapshot.clear()
+    return rates
+
+
+def invalidate_exchange_rates():
+    cache.delete(exchange_models.CACHE_KEY)
+    exchange_rates_snapshot.invalidate()
+
+
+def get_conversion_factor(from_currency, to_currency, rates):
+    """Return the factor converting amounts between two currencies.
+
+    Amounts are converted through the base currency, the same way
+    `django_prices_openexchangerates.exchange_currency` does.
+    """
+    factor = Decimal(1)
+    try:
+        if from_currency != BASE_CURRENCY:
+            factor /= rates[from_currency]
+        if to_currency != BASE_CURRENCY:
+            factor *= rates[to_currency]
+    except KeyError as e:
+        raise ValueError('No conversion rate for %s' % (e.args[0],))
+    return factor
+
+
+def _get_currency(price):
+    if isinstance(price, PriceRange):
+        return price.min_price.currency
+    return price.currency
+
+
+def _convert(price, factor, currency):
+    if isinstance(price, PriceRange):
+        return PriceRange(
+            _convert(price.min_price, factor, currency),
+            _convert(price.max_price, factor, currency))
+    return Price(
+        net=price.net * factor, gross=price.gross * factor,
+        currency=currency)
+
+
+def exchange_prices(prices, currency, rates=None):
+    """Convert many prices or price ranges to the given currency.
+
+    Conversion factors are computed once per source currency. Items that
+    cannot be converted because of a missing rate are returned as `None`,
+    as are `None` items.
+    """
+    if rates is None:
+        rates = get_exchange_rates()
+    factors = {}
+    results = []
+    for price in prices:
+        if price is None:
+            results.append(None)
+            continue
+        from_currency = _get_currency(price)
+        if from_currency == currency:
+            results.append(price)
+            continue
+        if from_currency not in factors:
+            try:
+                factors[from_currency] = get_conversion_factor(
+                    from_currency, currency, rates)
+            except ValueError:
+                factors[from_currency] = None
+        factor = factors[from_currency]
+        results.append(
+            _convert(price, factor, currency) if factor is not None else None)
+    return results
@@ -0,0 +1,123 @@
+"""Caching of whole storefront pages rendered for anonymous visitors."""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.template.response import TemplateResponse
+from django.utils.encoding import smart_text
+from django.utils.translation import get_language
+
+from .cache import get_cache_versions
+
+PAGE_CACHE_KEY = 'page:%s'
+CSRF_TOKEN_PLACEHOLDER = '__page_cache_csrf_token__'
+CART_COUNTER_PLACEHOLDER = '__page_cache_cart_counter__'
+
+
+def is_page_cacheable(request):
+    """Return whether the page requested can be served from the cache.
+
+    Only anonymous visitors without pending messages share cached pages.
+    """
+    return (
+        settings.ENABLE_PAGE_CACHE
+        and request.method in ('GET', 'HEAD')
+        and not request.user.is_authenticated
+        and not len(get_messages(request)))
+
+
+def is_response_cacheable(response):
+    return (
+        isinstance(response, TemplateResponse)
+        and not response.is_rendered
+        and response.status_code == 200
+        and not response.cookies)
+
+
+def get_page_digest(request, version_names, extra_parts=()):
+    """Return a digest of a page for the language, currency and country.
+
+    The digest changes whenever any of the named cache versions is bumped.
+    """
+    versions = get_cache_versions(version_names)
+    country = getattr(request, 'country', None)
+    parts = [
+        request.get_host(), request.get_full_path(), get_language(),
+        getattr(request, 'currency', ''), getattr(country, 'code', '')]
+    parts += [versions[name] for name in version_names]
+    parts += list(extra_parts)
+    digest = hashlib.md5(
+        '|'.join(smart_text(part) for part in parts).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def get_page_cache_key(request, version_names):
+    return PAGE_CACHE_KEY % (get_page_digest(request, version_names),)
+
+
+def get_version_names(version_names, view_kwargs):
+    """Resolve names given as callables using keyword arguments of a view."""
+    return [
+        name(**view_kwargs) if callable(name) else name
+        for name in version_names]
+
+
+def render_cart_counter(request):
+    # pylint: disable=cyclic-import
+    from ...cart.context_processors import cart_counter
+
+    return render_to_string('cart_counter.html', cart_counter(request))
+
+
+def get_page_response(request, page):
+    """Return a response of a cached page with visitor data filled in."""
+    content = page['content']
+    csrf_token = CSRF_TOKEN_PLACEHOLDER.encode('utf-8')
+    if csrf_token in content:
+        content = content.replace(
+            csrf_token, get_token(request).encode('utf-8'))
+    cart_counter = CART_COUNTER_PLACEHOLDER.encode('utf-8')
+    if cart_counter in content:
+        content = content.replace(
+            cart_counter, render_cart_counter(request).encode('utf-8'))
+    return HttpResponse(content, content_type=page['content_type'])
+
+
+def cache_anonymous_page(*version_names):
+    """Decorate a storefront view to cache pages rendered for anonymous users.
+
+    Pages are only cached when `ENABLE_PAGE_CACHE` is set and are kept until
+    any of the cache versions named by `version_names` is bumped. Names can
+    also be callables returning a name from the view keyword arguments, for
+    versions of single objects. The CSRF token and the cart counter are
+    rendered as placeholders, which are filled in on every response.
+    """
+    def decorator(view):
+        @wraps(view)
+        def func(request, *args, **kwargs):
+            if not is_page_cacheable(request):
+                return view(request, *args, **kwargs)
+            key = get_page_cache_key(
+                request, get_version_names(version_names, kwargs))
+            page = cache.get(key)
+            if page is None:
+                response = view(request, *args, **kwargs)
+                if not is_response_cacheable(response):
+                    return response
+                response.context_data = response.context_data or {}
+                response.context_data.update({
+                    'csrf_token': CSRF_TOKEN_PLACEHOLDER,
+                    'cart_counter_placeholder': CART_COUNTER_PLACEHOLDER})
+                response.render()
+                page = {
+                    'content': response.content,
+                    'content_type': response['Content-Type']}
+                cache.set(key, page, settings.PAGE_CACHE_TIMEOUT)
+            return get_page_response(request, page)
+        return func
+    return decorator
@@ -6,11 +6,14 @@ from django.utils.translation import pgettext_lazy
 from impersonate.views import impersonate as orig_impersonate
 
 from ..dashboard.views import staff_member_required
+from ..product.page_cache import LISTING_VERSION_NAMES
 from ..product.utils import products_for_homepage, products_with_availability
 from ..userprofile.models import User
+from .utils.page_cache import cache_anonymous_page
 from .utils.schema import get_webpage_schema
 
 
+@cache_anonymous_page(*LISTING_VERSION_NAMES)
 def home(request):
     products = products_for_homepage()[:8]
     featured_products = products.exists()
@@ -7,6 +7,7 @@ from django.utils.text import slugify
 from django.utils.translation import gettext_lazy, pgettext_lazy
 
 from . import ProductBulkAction
+from ...product.counts import update_products_category_counts
 from ...product.models import (
     AttributeChoiceValue, Collection, Product, ProductAttribute, ProductImage,
     ProductType, ProductVariant, Stock, StockLocation, VariantImage)
@@ -116,7 +117,7 @@ class ProductForm(forms.ModelForm):
 
     class Meta:
         model = Product
-        exclude = ['attributes', 'product_type', 'updated_at']
+        exclude = ['attributes', 'product_type', 'updated_at', 'slug']
         labels = {
             'name': pgettext_lazy('Item name', 'Name'),
             'description': pgettext_lazy('Description', 'Description'),
@@ -183,7 +184,7 @@ class ProductForm(forms.ModelForm):
 class ProductVariantForm(forms.ModelForm):
     class Meta:
         model = ProductVariant
-        exclude = ['attributes', 'product', 'images']
+        exclude = ['attributes', 'product', 'images', 'display_name']
         labels = {
             'sku': pgettext_lazy('SKU', 'SKU'),
             'price_override': pgettext_lazy(
@@ -404,6 +405,9 @@ class ProductBulkUpdate(forms.Form):
             self._publish_products()
         elif action == ProductBulkAction.UNPUBLISH:
             self._unpublish_products()
+        # Bulk updates bypass model signals
+        update_products_category_counts(
+            [product.pk for product in self.cleaned_data['products']])
 
     def _publish_products(self):
         self.cleaned_data['products'].update(is_published=True)
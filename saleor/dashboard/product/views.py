@@ -14,6 +14,7 @@ from ...core.utils import get_paginator_items
 from ...product.models import (
     AttributeChoiceValue, Product, ProductAttribute, ProductImage, ProductType,
     ProductVariant, Stock, StockLocation)
+from ...product.price_engine import get_variants_prices
 from ...product.utils import (
     get_availability, get_product_costs_data, get_variant_costs_data)
 from ..views import staff_member_required
@@ -784,24 +785,27 @@ def ajax_available_variants_list(request):
 
     Response format is that of a Select2 JS widget.
     """
-    def get_variant_label(variant, discounts):
+    def get_variant_label(variant, variant_prices):
         return '%s, %s, %s' % (
             variant.sku, variant.display_product(),
-            gross(variant.get_price_per_item(discounts)))
+            gross(variant_prices.price))
 
     available_products = Product.objects.available_products()
     queryset = ProductVariant.objects.filter(
-        product__in=available_products).prefetch_related('product')
+        product__in=available_products).prefetch_related(
+            'product__category')
     search_query = request.GET.get('q', '')
     if search_query:
         queryset = queryset.filter(
             Q(sku__icontains=search_query) |
             Q(name__icontains=search_query) |
             Q(product__name__icontains=search_query))
-    discounts = request.discounts
+    queryset = list(queryset)
+    variants_prices = get_variants_prices(
+        queryset, discounts=request.discounts, include_taxes=False)
     variants = [
-        {'id': variant.id, 'text': get_variant_label(variant, discounts)}
-        for variant in queryset
+        {'id': variant.id, 'text': get_variant_label(variant, prices)}
+        for variant, prices in zip(queryset, variants_prices)
     ]
     return JsonResponse({'results': variants})
 
@@ -3,13 +3,12 @@ from django.contrib.admin.views.decorators import (
     staff_member_required as _staff_member_required, user_passes_test)
 from django.contrib.auth import REDIRECT_FIELD_NAME
 from django.core.mail import send_mail
-from django.db.models import Q, Sum
 from django.http import JsonResponse, HttpResponseBadRequest
 from django.template.response import TemplateResponse
 from payments import PaymentStatus
 
 from ..order.models import Order, Payment
-from ..product.models import Product
+from ..product.low_stock import get_low_stock_products
 
 
 def staff_member_required(f):
@@ -54,13 +53,6 @@ def styleguide(request):
     return TemplateResponse(request, 'dashboard/styleguide/index.html', {})
 
 
-def get_low_stock_products():
-    threshold = getattr(settings, 'LOW_STOCK_THRESHOLD', 10)
-    products = Product.objects.annotate(
-        total_stock=Sum('variants__stock__quantity'))
-    return products.filter(Q(total_stock__lte=threshold)).distinct()
-
-
 @staff_member_required
 def send_test_mail(request):
     if 'recipient' not in request.GET:
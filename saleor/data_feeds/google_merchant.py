@@ -8,8 +8,11 @@ from django.core.files.storage import default_storage
 from django.utils.encoding import smart_text
 
 from ..discount.models import Sale
-from ..product.models import (
-    AttributeChoiceValue, Category, ProductAttribute, ProductVariant)
+from ..discount.utils import SaleIndex
+from ..product.attributes import get_attribute_registry
+from ..product.categories import get_category_tree
+from ..product.models import Category, ProductVariant
+from ..product.price_engine import get_variants_prices
 
 CATEGORY_SEPARATOR = ' > '
 
@@ -25,13 +28,20 @@ def get_feed_file_url():
     return default_storage.url(FILE_PATH)
 
 
+def get_feed_modified_time(request, *args, **kwargs):
+    """Return the time the feed was last written if the storage can tell."""
+    try:
+        return default_storage.get_modified_time(FILE_PATH)
+    except (NotImplementedError, OSError):
+        return None
+
+
 def get_feed_items():
     items = ProductVariant.objects.all()
     items = items.select_related('product')
+    # Attribute names are resolved from the attribute registry
     items = items.prefetch_related(
-        'images', 'stock', 'product__category',
-        'product__images', 'product__product_type__product_attributes',
-        'product__product_type__variant_attributes')
+        'images', 'product__category', 'product__images')
     return items
 
 
@@ -99,14 +109,17 @@ def item_brand(item, attributes_dict, attribute_values_dict):
     return brand
 
 
-def item_tax(item, discounts):
+def item_tax(item, discounts, variant_prices=None):
     """Return item tax.
 
     For some countries you need to set tax info
     Read more:
     https://support.google.com/merchants/answer/6324454
     """
-    price = item.get_price_per_item(discounts=discounts)
+    if variant_prices:
+        price = variant_prices.price
+    else:
+        price = item.get_price_per_item(discounts=discounts)
     return 'US::%s:y' % price.tax
 
 
@@ -139,24 +152,32 @@ def item_google_product_category(item, category_paths):
     if category.pk in category_paths:
         return category_paths[category.pk]
     ancestors = [
-        ancestor.name for ancestor in list(category.get_ancestors())]
+        ancestor.name
+        for ancestor in get_category_tree().get_ancestors(category.pk)]
     category_path = CATEGORY_SEPARATOR.join(ancestors + [category.name])
     category_paths[category.pk] = category_path
     return category_path
 
 
-def item_price(item):
-    price = item.get_price_per_item(discounts=None)
+def item_price(item, variant_prices=None):
+    if variant_prices:
+        price = variant_prices.price_undiscounted
+    else:
+        price = item.get_price_per_item(discounts=None)
     return '%s %s' % (price.gross, price.currency)
 
 
-def item_sale_price(item, discounts):
-    sale_price = item.get_price_per_item(discounts=discounts)
+def item_sale_price(item, discounts, variant_prices=None):
+    if variant_prices:
+        sale_price = variant_prices.price
+    else:
+        sale_price = item.get_price_per_item(discounts=discounts)
     return '%s %s' % (sale_price.gross, sale_price.currency)
 
 
 def item_attributes(item, categories, category_paths, current_site,
-                    discounts, attributes_dict, attribute_values_dict):
+                    discounts, attributes_dict, attribute_values_dict,
+                    variant_prices=None):
     product_data = {
         'id': item_id(item),
         'title': item_title(item),
@@ -173,13 +194,13 @@ def item_attributes(item, categories, category_paths, current_site,
     if image_link:
         product_data['image_link'] = image_link
 
-    price = item_price(item)
+    price = item_price(item, variant_prices)
     product_data['price'] = price
-    sale_price = item_sale_price(item, discounts)
+    sale_price = item_sale_price(item, discounts, variant_prices)
     if sale_price != price:
         product_data['sale_price'] = sale_price
 
-    tax = item_tax(item, discounts)
+    tax = item_tax(item, discounts, variant_prices)
     if tax:
         product_data['tax'] = tax
 
@@ -195,17 +216,23 @@ def write_feed(file_obj):
     writer = csv.DictWriter(file_obj, ATTRIBUTES, dialect=csv.excel_tab)
     writer.writeheader()
     categories = Category.objects.all()
-    discounts = Sale.objects.all().prefetch_related('products',
-                                                    'categories')
-    attributes_dict = {a.slug: a.pk for a in ProductAttribute.objects.all()}
-    attribute_values_dict = {smart_text(a.pk): smart_text(a) for a
-                             in AttributeChoiceValue.objects.all()}
+    discounts = SaleIndex(Sale.objects.all())
+    registry = get_attribute_registry()
+    attributes_dict = registry.attribute_pks
+    attribute_values_dict = {
+        smart_text(value.pk): smart_text(value)
+        for attribute in registry.get_attributes()
+        for value in registry.get_values(attribute.pk)}
     category_paths = {}
     current_site = Site.objects.get_current()
-    for item in get_feed_items():
+    items = list(get_feed_items())
+    # Price all items at once rather than one by one
+    items_prices = get_variants_prices(
+        items, discounts=discounts, include_taxes=False)
+    for item, variant_prices in zip(items, items_prices):
         item_data = item_attributes(item, categories, category_paths,
                                     current_site, discounts, attributes_dict,
-                                    attribute_values_dict)
+                                    attribute_values_dict, variant_prices)
         writer.writerow(item_data)
 
 
@@ -1,10 +1,11 @@
 from django.conf.urls import url
+from django.views.decorators.http import last_modified
 from django.views.generic.base import RedirectView
 
-from .google_merchant import get_feed_file_url
+from .google_merchant import get_feed_file_url, get_feed_modified_time
 
 urlpatterns = [
     url(r'google/$',
-        RedirectView.as_view(
-            get_redirect_url=get_feed_file_url, permanent=True),
+        last_modified(get_feed_modified_time)(RedirectView.as_view(
+            get_redirect_url=get_feed_file_url, permanent=True)),
         name='google-feed')]
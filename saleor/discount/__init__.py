@@ -1,7 +1,23 @@
+from django.apps import AppConfig
 from django.conf import settings
 from django.utils.translation import pgettext_lazy
 
 
+class DiscountAppConfig(AppConfig):
+    name = 'saleor.discount'
+
+    def ready(self):
+        from django.db.models.signals import (
+            m2m_changed, post_delete, post_save)
+        from .models import Sale
+        from .signals import invalidate_sales
+        for sender in (Sale, 'product.Category'):
+            post_save.connect(invalidate_sales, sender=sender)
+            post_delete.connect(invalidate_sales, sender=sender)
+        for sender in (Sale.products.through, Sale.categories.through):
+            m2m_changed.connect(invalidate_sales, sender=sender)
+
+
 class DiscountValueType:
     FIXED = 'fixed'
     PERCENTAGE = 'percentage'
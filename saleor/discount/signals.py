@@ -0,0 +1,8 @@
+from .utils import sales_snapshot
+
+
+def invalidate_sales(sender, **kwargs):
+    """Invalidate the sales snapshot when sales or their rules change."""
+    action = kwargs.get('action')
+    if action is None or action.startswith('post_'):
+        sales_snapshot.invalidate()
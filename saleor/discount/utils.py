@@ -1,6 +1,10 @@
+from bisect import bisect_right
+from collections import defaultdict
+
 from django.db.models import F
 
-from .models import NotApplicable
+from ..core.utils.cache import ProcessSnapshot
+from .models import NotApplicable, Sale
 
 
 def increase_voucher_usage(voucher):
@@ -13,7 +17,118 @@ def decrease_voucher_usage(voucher):
     voucher.save(update_fields=['used'])
 
 
+class SaleIndex:
+    """Compiled lookup of the sales applicable to a product.
+
+    Product rules are kept in a dictionary keyed by the product's primary
+    key. Category rules are kept as MPTT `(lft, rght)` intervals grouped by
+    `tree_id`, so a product matches a category sale when its category lies
+    within the interval, without walking the tree. Matches are memoized per
+    category.
+
+    The index is compiled lazily from the given sales on first lookup and
+    iterates over the sales like the sequence it was created from.
+    """
+
+    def __init__(self, sales):
+        self._source = sales
+        self._sales = None
+        self._product_sales = None
+        self._category_intervals = None
+        self._category_sales = {}
+        self._modifiers = {}
+
+    def __iter__(self):
+        return iter(self.sales)
+
+    def __len__(self):
+        return len(self.sales)
+
+    def __repr__(self):
+        return 'SaleIndex(%r)' % (self.sales,)
+
+    @property
+    def sales(self):
+        if self._sales is None:
+            self._compile()
+        return self._sales
+
+    def _compile(self):
+        sales = list(self._source)
+        sales_map = {sale.pk: sale for sale in sales}
+        product_sales = defaultdict(list)
+        category_intervals = defaultdict(list)
+        if sales_map:
+            product_rules = Sale.products.through.objects.filter(
+                sale_id__in=sales_map).values_list('sale_id', 'product_id')
+            for sale_id, product_id in product_rules:
+                product_sales[product_id].append(sales_map[sale_id])
+            category_rules = Sale.categories.through.objects.filter(
+                sale_id__in=sales_map).values_list(
+                    'sale_id', 'category__tree_id', 'category__lft',
+                    'category__rght')
+            for sale_id, tree_id, lft, rght in category_rules:
+                category_intervals[tree_id].append(
+                    (lft, rght, sales_map[sale_id]))
+        for intervals in category_intervals.values():
+            intervals.sort(key=lambda interval: interval[:2])
+        self._product_sales = dict(product_sales)
+        self._category_intervals = {
+            tree_id: ([interval[0] for interval in intervals], intervals)
+            for tree_id, intervals in category_intervals.items()}
+        self._sales = sales
+
+    def _get_category_sales(self, product):
+        category_id = product.category_id
+        if category_id not in self._category_sales:
+            category = product.category
+            lfts, intervals = self._category_intervals.get(
+                category.tree_id, ((), ()))
+            # Only intervals opened at or before the category can contain it
+            candidates = intervals[:bisect_right(lfts, category.lft)]
+            self._category_sales[category_id] = [
+                sale for (lft, rght, sale) in candidates
+                if rght >= category.rght]
+        return self._category_sales[category_id]
+
+    def get_sales_for_product(self, product):
+        """Return the sales applicable to the given product."""
+        if self._sales is None:
+            self._compile()
+        sales = list(self._product_sales.get(product.pk, []))
+        if self._category_intervals:
+            sales.extend(
+                sale for sale in self._get_category_sales(product)
+                if sale not in sales)
+        return sales
+
+    def get_modifiers_for_product(self, product):
+        """Return the price modifiers of sales applicable to the product."""
+        for sale in self.get_sales_for_product(product):
+            if sale.pk not in self._modifiers:
+                self._modifiers[sale.pk] = sale.get_discount()
+            yield self._modifiers[sale.pk]
+
+
+def load_sale_index():
+    index = SaleIndex(Sale.objects.all())
+    # Compile right away so the shared snapshot is ready to use
+    index.sales  # pylint: disable=W0104
+    return index
+
+
+sales_snapshot = ProcessSnapshot('sales', load_sale_index)
+
+
+def get_sale_index():
+    """Return the compiled index of sales shared by the current process."""
+    return sales_snapshot.get()
+
+
 def get_product_discounts(product, discounts, **kwargs):
+    if isinstance(discounts, SaleIndex):
+        yield from discounts.get_modifiers_for_product(product)
+        return
     for discount in discounts:
         try:
             yield discount.modifier_for_product(product, **kwargs)
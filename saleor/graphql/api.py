@@ -3,7 +3,8 @@ from graphene import relay
 from graphene_django.debug import DjangoDebug
 
 from .product.types import (
-    CategoryType, ProductAttributeType, resolve_attributes, resolve_category)
+    CategoryType, CollectionType, ProductAttributeType, resolve_attributes,
+    resolve_category, resolve_collection)
 
 
 class Query(graphene.ObjectType):
@@ -13,6 +14,9 @@ class Query(graphene.ObjectType):
     category = graphene.Field(
         CategoryType,
         pk=graphene.Argument(graphene.Int, required=True))
+    collection = graphene.Field(
+        CollectionType,
+        pk=graphene.Argument(graphene.Int, required=True))
     node = relay.Node.Field()
     root = graphene.Field(lambda: Query)
     debug = graphene.Field(DjangoDebug, name='_debug')
@@ -21,6 +25,10 @@ class Query(graphene.ObjectType):
         pk = args.get('pk')
         return resolve_category(pk, info)
 
+    def resolve_collection(self, info, **args):
+        pk = args.get('pk')
+        return resolve_collection(pk, info)
+
     def resolve_attributes(self, info, **args):
         category_pk = args.get('category_pk')
         return resolve_attributes(category_pk)
@@ -0,0 +1,77 @@
+import base64
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from graphene import relay
+
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(values):
+    data = json.dumps(values, cls=DjangoJSONEncoder).encode('utf-8')
+    return base64.urlsafe_b64encode(data).decode('ascii')
+
+
+def decode_cursor(cursor, length):
+    try:
+        values = json.loads(
+            base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+    except (ValueError, TypeError):
+        values = None
+    if not isinstance(values, list) or len(values) != length:
+        raise ValueError('Invalid cursor: %s' % (cursor,))
+    return values
+
+
+def get_keyset_lookup(sort_field, values, descending):
+    """Return a lookup matching rows placed after the given key."""
+    operator = 'lt' if descending else 'gt'
+    pk_lookup = Q(**{'pk__%s' % operator: values[-1]})
+    if sort_field == 'pk':
+        return pk_lookup
+    sort_value = values[0]
+    return (
+        Q(**{'%s__%s' % (sort_field, operator): sort_value}) |
+        Q(**{sort_field: sort_value}) & pk_lookup)
+
+
+def connection_from_keyset(
+        connection_type, queryset, sort_field='pk', descending=False,
+        first=None, after=None):
+    """Return a page of the queryset as an instance of a Relay connection.
+
+    Rows are ordered by `(sort_field, pk)` and cursors encode the values of
+    that key, so fetching any page is a single indexed range query whose
+    cost does not depend on how deep into the listing it starts.
+    """
+    key_length = 1 if sort_field == 'pk' else 2
+    if first is None or first > MAX_PAGE_SIZE:
+        first = MAX_PAGE_SIZE
+    if first < 0:
+        raise ValueError('Argument "first" must be a non-negative integer.')
+    if after:
+        values = decode_cursor(after, key_length)
+        queryset = queryset.filter(
+            get_keyset_lookup(sort_field, values, descending))
+    ordering = ['pk'] if sort_field == 'pk' else [sort_field, 'pk']
+    if descending:
+        ordering = ['-%s' % field for field in ordering]
+    # Fetch one extra row to find out whether there is a next page
+    rows = list(queryset.order_by(*ordering)[:first + 1])
+    has_next_page = len(rows) > first
+    rows = rows[:first]
+
+    edges = []
+    for row in rows:
+        key = [row.pk]
+        if sort_field != 'pk':
+            key.insert(0, getattr(row, sort_field))
+        edges.append(
+            connection_type.Edge(node=row, cursor=encode_cursor(key)))
+    page_info = relay.PageInfo(
+        start_cursor=edges[0].cursor if edges else None,
+        end_cursor=edges[-1].cursor if edges else None,
+        has_previous_page=bool(after),
+        has_next_page=has_next_page)
+    return connection_type(edges=edges, page_info=page_info)
@@ -0,0 +1,56 @@
+from collections import defaultdict
+
+from promise import Promise
+from promise.dataloader import DataLoader
+
+CONTEXT_LOADERS_NAME = '__loaders__'
+
+
+class BaseLoader(DataLoader):
+    """Batching and caching loader bound to a single GraphQL request.
+
+    Keys requested by resolvers of the same tree level are coalesced into a
+    single call to `load_batch`. Use `for_context` to get the loader shared
+    by all resolvers of the request.
+    """
+
+    def __init__(self, context):
+        super().__init__()
+        self.context = context
+
+    @classmethod
+    def for_context(cls, context):
+        loaders = getattr(context, CONTEXT_LOADERS_NAME, None)
+        if loaders is None:
+            loaders = {}
+            setattr(context, CONTEXT_LOADERS_NAME, loaders)
+        if cls not in loaders:
+            loaders[cls] = cls(context)
+        return loaders[cls]
+
+    def batch_load_fn(self, keys):
+        return Promise.resolve(self.load_batch(keys))
+
+    def load_batch(self, keys):
+        """Return a list of values matching the given list of keys."""
+        raise NotImplementedError()
+
+
+class GroupedLoader(BaseLoader):
+    """Load lists of objects sharing the value of a field.
+
+    Subclasses define a `queryset` and the `key_field` used both to filter it
+    and to group the results.
+    """
+
+    key_field = None
+
+    def get_queryset(self):
+        raise NotImplementedError()
+
+    def load_batch(self, keys):
+        lookup = {'%s__in' % self.key_field: keys}
+        groups = defaultdict(list)
+        for obj in self.get_queryset().filter(**lookup):
+            groups[getattr(obj, self.key_field)].append(obj)
+        return [groups.get(key, []) for key in keys]
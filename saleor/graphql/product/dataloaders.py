@@ -0,0 +1,30 @@
+from ...product.counts import get_categories_product_counts
+from ...product.models import Category, ProductImage, ProductVariant
+from ..core.dataloaders import BaseLoader, GroupedLoader
+
+
+class CategoryChildrenLoader(GroupedLoader):
+    key_field = 'parent_id'
+
+    def get_queryset(self):
+        return Category.objects.order_by('tree_id', 'lft')
+
+
+class ProductCountByCategoryLoader(BaseLoader):
+    def load_batch(self, keys):
+        counts = get_categories_product_counts(keys)
+        return [counts.get(key, 0) for key in keys]
+
+
+class ImagesByProductLoader(GroupedLoader):
+    key_field = 'product_id'
+
+    def get_queryset(self):
+        return ProductImage.objects.all()
+
+
+class VariantsByProductLoader(GroupedLoader):
+    key_field = 'product_id'
+
+    def get_queryset(self):
+        return ProductVariant.objects.all()
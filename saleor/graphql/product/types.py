@@ -1,29 +1,30 @@
-import functools
-import operator
+from collections import defaultdict
 
 from django.db.models import Q
 import graphene
 from graphene import relay
-from graphene_django import DjangoConnectionField, DjangoObjectType
+from graphene_django import DjangoObjectType
 
+from ...product.attributes import get_attribute_registry
+from ...product.categories import (
+    get_category_products_lookup, get_category_tree)
+from ...product.facets import get_attributes_lookup
 from ...product.models import (
-    AttributeChoiceValue, Category, Product, ProductAttribute, ProductImage,
-    ProductVariant)
-from ...product.templatetags.product_images import product_first_image
-from ...product.utils import get_availability, products_visible_to_user
+    AttributeChoiceValue, Category, Collection, Product, ProductAttribute,
+    ProductImage, ProductVariant)
+from ...product.templatetags.product_images import get_thumbnail
+from ...product.utils import (
+    get_availability, get_availability_from_pricing,
+    products_visible_to_user)
+from ..core.connection import MAX_PAGE_SIZE, connection_from_keyset
 from ..core.types import PriceRangeType, PriceType
-from ..utils import CategoryAncestorsCache, DjangoPkInterface
+from ..utils import DjangoPkInterface
+from .dataloaders import (
+    CategoryChildrenLoader, ImagesByProductLoader,
+    ProductCountByCategoryLoader, VariantsByProductLoader)
 from .scalars import AttributesFilterScalar
 
-CONTEXT_CACHE_NAME = '__cache__'
-CACHE_ANCESTORS = 'ancestors'
-
-
-def get_ancestors_from_cache(category, context):
-    cache = getattr(context, CONTEXT_CACHE_NAME, None)
-    if cache and CACHE_ANCESTORS in cache:
-        return cache[CACHE_ANCESTORS].get(category)
-    return category.get_ancestors()
+PRODUCT_SORT_FIELDS = {'name': 'name', 'price': 'effective_price'}
 
 
 class ProductAvailabilityType(graphene.ObjectType):
@@ -57,26 +58,38 @@ class ProductType(DjangoObjectType):
         size = args.get('size')
         if not size:
             size = '255x255'
-        return product_first_image(self, size)
+        images = ImagesByProductLoader.for_context(info.context).load(self.pk)
+        return images.then(lambda images: get_thumbnail(
+            images[0].image if images else None, size, 'crop'))
 
     def resolve_images(self, info):
-        return self.images.all()
+        return ImagesByProductLoader.for_context(info.context).load(self.pk)
 
     def resolve_variants(self, info):
-        return self.variants.all()
+        return VariantsByProductLoader.for_context(info.context).load(self.pk)
 
     def resolve_url(self, info):
         return self.get_absolute_url()
 
     def resolve_availability(self, info):
         context = info.context
-        a = get_availability(self, context.discounts, context.currency)
+        pricing = getattr(self, 'pricing', None)
+        if pricing is not None:
+            a = get_availability_from_pricing(self, pricing, context.currency)
+        else:
+            a = get_availability(self, context.discounts, context.currency)
         return ProductAvailabilityType(**a._asdict())
 
 
-class CategoryType(DjangoObjectType):
-    products = DjangoConnectionField(
-        ProductType,
+def products_connection_field():
+    return graphene.Field(
+        ProductType._meta.connection,
+        first=graphene.Argument(
+            graphene.Int, description="""The number of products to return,
+                at most %d.""" % MAX_PAGE_SIZE),
+        after=graphene.Argument(
+            graphene.String, description="""Return products following the
+                given cursor."""),
         attributes=graphene.Argument(
             graphene.List(AttributesFilterScalar),
             description="""A list of attribute:value pairs to filter
@@ -91,6 +104,58 @@ class CategoryType(DjangoObjectType):
         price_gte=graphene.Argument(
             graphene.Float, description="""Get the products with price greater
                 than or equal to the given value"""))
+
+
+def filter_products_by_attributes(qs, attributes_filter):
+    registry = get_attribute_registry()
+    attributes_map = registry.attribute_pks
+    values_map = {slug: registry.get_value_pks(pk)
+                  for slug, pk in attributes_map.items()}
+    queries = defaultdict(list)
+    # Convert attribute:value pairs into a dictionary where
+    # attributes are keys and values are grouped in lists
+    for attr_name, val_slug in attributes_filter:
+        attr_pk = attributes_map.get(attr_name)
+        attr_val_pk = values_map.get(attr_name, {}).get(val_slug)
+        if attr_pk is not None and attr_val_pk is not None:
+            queries[attr_pk].append(attr_val_pk)
+    if queries:
+        # Values of the same attribute are combined with OR operator
+        # and attributes are combined with AND operator.
+        qs = qs.filter(get_attributes_lookup(queries))
+    return qs
+
+
+def resolve_products_connection(qs, info, **args):
+    qs = qs.select_related('pricing').prefetch_related('category')
+
+    attributes_filter, order_by, price_lte, price_gte = map(
+        args.get, ['attributes', 'order_by', 'price_lte', 'price_gte'])
+
+    if attributes_filter:
+        qs = filter_products_by_attributes(qs, attributes_filter)
+
+    qs = qs.annotate_effective_price()
+    if price_lte:
+        qs = qs.filter(effective_price__lte=price_lte)
+    if price_gte:
+        qs = qs.filter(effective_price__gte=price_gte)
+
+    sort_field, descending = 'pk', False
+    if order_by:
+        descending = order_by.startswith('-')
+        try:
+            sort_field = PRODUCT_SORT_FIELDS[order_by.lstrip('-')]
+        except KeyError:
+            raise ValueError('Cannot sort products by "%s".' % order_by)
+    return connection_from_keyset(
+        ProductType._meta.connection, qs, sort_field=sort_field,
+        descending=descending, first=args.get('first'),
+        after=args.get('after'))
+
+
+class CategoryType(DjangoObjectType):
+    products = products_connection_field()
     products_count = graphene.Int()
     url = graphene.String()
     ancestors = graphene.List(lambda: CategoryType)
@@ -102,82 +167,49 @@ class CategoryType(DjangoObjectType):
         interfaces = (relay.Node, DjangoPkInterface)
 
     def resolve_ancestors(self, info):
-        return get_ancestors_from_cache(self, info.context)
+        return get_category_tree().get_ancestors(self.pk)
 
     def resolve_children(self, info):
-        return self.children.all()
+        return CategoryChildrenLoader.for_context(info.context).load(self.pk)
 
     def resolve_siblings(self, info):
-        return self.get_siblings()
+        if self.parent_id is None:
+            return [
+                root for root in get_category_tree().roots
+                if root.pk != self.pk]
+        children = CategoryChildrenLoader.for_context(info.context).load(
+            self.parent_id)
+        return children.then(lambda children: [
+            child for child in children if child.pk != self.pk])
 
     def resolve_products_count(self, info):
-        return self.products.count()
+        loader = ProductCountByCategoryLoader.for_context(info.context)
+        return loader.load(self.pk)
 
     def resolve_url(self, info):
-        ancestors = get_ancestors_from_cache(self, info.context)
-        return self.get_absolute_url(ancestors)
+        return self.get_absolute_url()
 
     def resolve_products(self, info, **args):
-        context = info.context
-        qs = products_visible_to_user(context.user)
-        qs = qs.prefetch_related('images', 'category', 'variants__stock')
-        qs = qs.filter(category=self)
-
-        attributes_filter, order_by, price_lte, price_gte = map(
-            args.get, ['attributes', 'order_by', 'price_lte', 'price_gte'])
-
-        if attributes_filter:
-            attributes = ProductAttribute.objects.prefetch_related('values')
-            attributes_map = {attribute.slug: attribute.pk
-                              for attribute in attributes}
-            values_map = {attr.slug: {value.slug: value.pk
-                                      for value in attr.values.all()}
-                          for attr in attributes}
-            queries = {}
-            # Convert attribute:value pairs into a dictionary where
-            # attributes are keys and values are grouped in lists
-            for attr_name, val_slug in attributes_filter:
-                try:
-                    attr_pk = attributes_map[attr_name]
-                except KeyError:
-                    attr_pk = None
-                else:
-                    try:
-                        attr_val_pk = values_map[attr_name][val_slug]
-                    except KeyError:
-                        attr_val_pk = None
-                    else:
-                        if attr_val_pk is not None and attr_pk not in queries:
-                            queries[attr_pk] = [attr_val_pk]
-                        else:
-                            queries[attr_pk].append(attr_val_pk)
-            if queries:
-                # Combine filters of the same attribute with OR operator
-                # and then combine full query with AND operator.
-                combine_and = [functools.reduce(operator.or_, [
-                    Q(**{'variants__attributes__%s' % key: v}) |
-                    Q(**{'attributes__%s' % key: v})
-                    for v in values]) for key, values in queries.items()]
-                query = functools.reduce(operator.and_, combine_and)
-                qs = qs.filter(query).distinct()
-
-        if order_by:
-            qs = qs.order_by(order_by)
-
-        def filter_by_price(queryset, value, operator):
-            return [
-                obj for obj in queryset
-                if operator(
-                    get_availability(obj, context.discounts)
-                    .price_range.min_price.gross, value)
-            ]
+        qs = products_visible_to_user(info.context.user)
+        qs = qs.filter(get_category_products_lookup([self]))
+        return resolve_products_connection(qs, info, **args)
 
-        if price_lte:
-            qs = filter_by_price(qs, price_lte, operator.le)
 
-        if price_gte:
-            qs = filter_by_price(qs, price_gte, operator.ge)
-        return qs
+class CollectionType(DjangoObjectType):
+    products = products_connection_field()
+    url = graphene.String()
+
+    class Meta:
+        model = Collection
+        interfaces = (relay.Node, DjangoPkInterface)
+
+    def resolve_url(self, info):
+        return self.get_absolute_url()
+
+    def resolve_products(self, info, **args):
+        qs = products_visible_to_user(info.context.user)
+        qs = qs.filter(collections=self)
+        return resolve_products_connection(qs, info, **args)
 
 
 class ProductVariantType(DjangoObjectType):
@@ -189,7 +221,7 @@ class ProductVariantType(DjangoObjectType):
         interfaces = (relay.Node, DjangoPkInterface)
 
     def resolve_stock_quantity(self, info):
-        return self.get_stock_quantity()
+        return self.quantity_available
 
 
 class ProductImageType(DjangoObjectType):
@@ -220,30 +252,28 @@ class ProductAttributeType(DjangoObjectType):
         interfaces = (relay.Node, DjangoPkInterface)
 
     def resolve_values(self, info):
-        return self.values.all()
+        return get_attribute_registry().get_values(self.pk)
 
 
 def resolve_category(pk, info):
-    categories = Category.tree.filter(pk=pk).get_cached_trees()
-    if categories:
-        category = categories[0]
-        cache = {CACHE_ANCESTORS: CategoryAncestorsCache(category)}
-        setattr(info.context, CONTEXT_CACHE_NAME, cache)
-        return category
-    return None
+    return Category.objects.filter(pk=pk).first()
 
 
 def resolve_attributes(category_pk):
-    queryset = ProductAttribute.objects.prefetch_related('values')
-    if category_pk:
-        # Get attributes that are used with product types
-        # within the given category.
-        tree = Category.objects.get(
-            pk=category_pk).get_descendants(include_self=True)
-        product_types = set(
-            [obj[0] for obj in Product.objects.filter(
-                category__in=tree).values_list('product_type_id')])
-        queryset = queryset.filter(
-            Q(product_types__in=product_types) |
-            Q(product_variant_types__in=product_types))
+    if not category_pk:
+        return get_attribute_registry().get_attributes()
+    # Get attributes that are used with product types
+    # within the given category.
+    tree = Category.objects.get(
+        pk=category_pk).get_descendants(include_self=True)
+    product_types = set(
+        [obj[0] for obj in Product.objects.filter(
+            category__in=tree).values_list('product_type_id')])
+    queryset = ProductAttribute.objects.filter(
+        Q(product_types__in=product_types) |
+        Q(product_variant_types__in=product_types))
     return queryset.distinct()
+
+
+def resolve_collection(pk, info):
+    return Collection.objects.filter(pk=pk).first()
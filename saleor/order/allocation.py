@@ -0,0 +1,115 @@
+"""Batched allocation of stock to order lines."""
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from prices import Price
+from satchless.item import InsufficientStock
+
+from ..product.models import Stock
+from ..product.utils import allocate_stocks
+
+
+def lock_stocks(variants):
+    """Return stock rows of the variants locked for update.
+
+    Rows are locked with a single query in the order of their pks, so
+    concurrent allocations always lock shared rows in the same order and
+    cannot deadlock. Locations are fetched without locking their rows.
+    """
+    return list(
+        Stock.objects.filter(variant__in=variants)
+        .select_related('location').select_for_update(of=('self',))
+        .order_by('pk'))
+
+
+def get_stock_preference(stock):
+    # Stock with the lowest cost price is used first, as in
+    # `ProductVariant.select_stockrecord`
+    zero_price = Price(0, currency=settings.DEFAULT_CURRENCY)
+    return stock.cost_price or zero_price, stock.pk
+
+
+def plan_allocation(entries, stocks):
+    """Split quantities of variants between their stock rows.
+
+    `entries` are `(group, variant, quantity)` triples. Return a list of
+    `(group, variant, stock, quantity)` tuples in the order of entries.
+    Raise `InsufficientStock` for the first variant that cannot be
+    fulfilled.
+    """
+    variant_stocks = defaultdict(list)
+    available = {}
+    for stock in stocks:
+        variant_stocks[stock.variant_id].append(stock)
+        available[stock.pk] = stock.quantity_available
+    plan = []
+    for group, variant, quantity in entries:
+        candidates = sorted(
+            variant_stocks[variant.pk], key=get_stock_preference)
+        for stock in candidates:
+            if quantity <= 0:
+                break
+            allocated = min(quantity, available[stock.pk])
+            if allocated > 0:
+                available[stock.pk] -= allocated
+                plan.append((group, variant, stock, allocated))
+                quantity -= allocated
+        if quantity > 0:
+            raise InsufficientStock(variant)
+    return plan
+
+
+def allocate_lines(entries, discounts=None):
+    """Create order lines of delivery groups and allocate their stock.
+
+    `entries` are `(group, variant, quantity)` triples, so lines of many
+    groups of an order can be created at once. All stock rows needed are
+    locked together and the allocation is planned in memory, so nothing is
+    written when any variant is out of stock. Order lines are then created
+    with one query and every stock row is updated once. Return the lines
+    created.
+    """
+    # pylint: disable=cyclic-import
+    from .models import OrderLine
+
+    entries = [entry for entry in entries if entry[2]]
+    variants = OrderedDict(
+        (variant.pk, variant) for dummy, variant, dummy in entries)
+    with transaction.atomic():
+        stocks = lock_stocks(list(variants))
+        plan = plan_allocation(entries, stocks)
+        prices = {
+            pk: variant.get_price_per_item(discounts)
+            for pk, variant in variants.items()}
+        lines = []
+        quantities = defaultdict(int)
+        for group, variant, stock, quantity in plan:
+            price = prices[variant.pk]
+            product = variant.product
+            lines.append(OrderLine(
+                delivery_group=group,
+                product=product,
+                product_name=variant.display_product(),
+                product_sku=variant.sku,
+                is_shipping_required=(
+                    product.product_type.is_shipping_required),
+                quantity=quantity,
+                unit_price_net=price.net,
+                unit_price_gross=price.gross,
+                stock=stock,
+                stock_location=stock.location.name if stock.location else ''))
+            quantities[stock.pk] += quantity
+        lines = OrderLine.objects.bulk_create(lines)
+        allocate_stocks(quantities)
+    return lines
+
+
+def allocate_variants(group, items, discounts=None):
+    """Create lines of a delivery group from pairs of variants and quantities.
+
+    See `allocate_lines`.
+    """
+    return allocate_lines(
+        [(group, variant, quantity) for variant, quantity in items],
+        discounts)
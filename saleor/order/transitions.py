@@ -1,15 +1,14 @@
 from saleor.order import GroupStatus
-from saleor.order.utils import add_variant_to_delivery_group
+from saleor.order.allocation import allocate_variants
 from saleor.product.utils import (
     deallocate_stock, decrease_stock, increase_stock)
 
 
 def process_delivery_group(group, cart_lines, discounts=None):
     """Fill shipment group with order lines created from partition items."""
-    for line in cart_lines:
-        add_variant_to_delivery_group(
-            group, line.variant, line.get_quantity(), discounts,
-            add_to_existing=False)
+    allocate_variants(
+        group, [(line.variant, line.get_quantity()) for line in cart_lines],
+        discounts)
 
 
 def cancel_delivery_group(group):
@@ -5,9 +5,9 @@ from django.db.models import F
 from django.shortcuts import get_object_or_404, redirect
 from django.utils.translation import pgettext_lazy
 from prices import Price
-from satchless.item import InsufficientStock
 
 from . import GroupStatus
+from .allocation import allocate_variants
 from ..product.utils import allocate_stock
 from ..userprofile.utils import store_user_address
 
@@ -75,37 +75,13 @@ def add_variant_to_delivery_group(
     By default, first adds variant to existing lines with same variant.
     It can be disabled with setting add_to_existing to False.
 
-    Order lines are created by increasing quantity of lines,
-    as long as total_quantity of variant will be added.
+    The remaining quantity is split between stock records into new lines
+    by `allocate_variants`.
     """
     quantity_left = (
         add_variant_to_existing_lines(group, variant, total_quantity)
         if add_to_existing else total_quantity)
-    price = variant.get_price_per_item(discounts)
-    while quantity_left > 0:
-        stock = variant.select_stockrecord()
-        if not stock:
-            raise InsufficientStock(variant)
-        quantity = (
-            stock.quantity_available
-            if quantity_left > stock.quantity_available
-            else quantity_left
-        )
-        group.lines.create(
-            product=variant.product,
-            product_name=variant.display_product(),
-            product_sku=variant.sku,
-            is_shipping_required=(
-                variant.product.product_type.is_shipping_required),
-            quantity=quantity,
-            unit_price_net=price.net,
-            unit_price_gross=price.gross,
-            stock=stock,
-            stock_location=stock.location.name)
-        allocate_stock(stock, quantity)
-        # refresh stock for accessing quantity_allocated
-        stock.refresh_from_db()
-        quantity_left -= quantity
+    allocate_variants(group, [(variant, quantity_left)], discounts)
 
 
 def add_variant_to_existing_lines(group, variant, total_quantity):
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class PageAppConfig(AppConfig):
+    name = 'saleor.page'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+        from .models import Page
+        from .signals import invalidate_pages
+        post_save.connect(invalidate_pages, sender=Page)
+        post_delete.connect(invalidate_pages, sender=Page)
@@ -0,0 +1,6 @@
+from .utils import invalidate_pages_cache
+
+
+def invalidate_pages(sender, **kwargs):
+    """Invalidate data cached for pages, such as the sitemap validators."""
+    invalidate_pages_cache()
@@ -1,7 +1,14 @@
+from ..core.utils.cache import bump_cache_version
 from .models import Page
 
+PAGES_VERSION_NAME = 'pages'
+
 
 def pages_visible_to_user(user):
     if user.is_authenticated and user.is_active and user.is_staff:
         return Page.objects.all()
     return Page.objects.public()
+
+
+def invalidate_pages_cache():
+    bump_cache_version(PAGES_VERSION_NAME)
@@ -1,6 +1,96 @@
+from django.apps import AppConfig
 from django.utils.translation import pgettext_lazy
 
 
+class ProductAppConfig(AppConfig):
+    name = 'saleor.product'
+
+    def ready(self):
+        from django.db.models.signals import (
+            m2m_changed, post_delete, post_save, pre_delete, pre_save)
+        from mptt.signals import node_moved
+        from ..discount.models import Sale
+        from . import signals
+        from .models import (
+            AttributeChoiceValue, Category, Collection, Product,
+            ProductAttribute, ProductImage, ProductType, ProductVariant, Stock)
+        post_save.connect(
+            signals.update_pricing_on_product_change, sender=Product)
+        pre_save.connect(signals.collect_product_state, sender=Product)
+        post_save.connect(
+            signals.update_category_counts_on_product_change, sender=Product)
+        post_save.connect(
+            signals.invalidate_facets_on_product_change, sender=Product)
+        post_delete.connect(
+            signals.update_category_counts_on_product_delete, sender=Product)
+        post_delete.connect(
+            signals.invalidate_facets_on_change, sender=Product)
+        post_save.connect(
+            signals.update_low_stock_on_variant_create, sender=ProductVariant)
+        post_delete.connect(
+            signals.update_low_stock_on_variant_delete, sender=ProductVariant)
+        post_save.connect(
+            signals.update_pricing_on_variant_change, sender=ProductVariant)
+        post_delete.connect(
+            signals.update_pricing_on_variant_delete, sender=ProductVariant)
+        post_save.connect(
+            signals.update_stock_status_on_stock_change, sender=Stock)
+        post_delete.connect(
+            signals.update_stock_status_on_stock_delete, sender=Stock)
+        for signal in (post_save, post_delete):
+            signal.connect(
+                signals.invalidate_product_cache_on_product_change,
+                sender=Product)
+            for sender in (ProductVariant, ProductImage):
+                signal.connect(
+                    signals.invalidate_product_cache_on_related_change,
+                    sender=sender)
+            signal.connect(
+                signals.invalidate_listings_cache_on_change,
+                sender=Collection)
+            for sender in (ProductAttribute, AttributeChoiceValue):
+                signal.connect(
+                    signals.invalidate_attributes_cache_on_change,
+                    sender=sender)
+            signal.connect(
+                signals.update_display_names_on_attribute_change,
+                sender=ProductAttribute)
+            signal.connect(
+                signals.update_display_names_on_value_change,
+                sender=AttributeChoiceValue)
+        for signal in (post_save, post_delete, node_moved):
+            signal.connect(
+                signals.invalidate_category_tree_on_change, sender=Category)
+        for signal in (post_delete, node_moved):
+            signal.connect(
+                signals.update_category_counts_on_tree_change,
+                sender=Category)
+            signal.connect(
+                signals.invalidate_facets_on_change, sender=Category)
+        post_save.connect(
+            signals.update_pricing_on_category_change, sender=Category)
+        post_save.connect(signals.update_pricing_on_sale_change, sender=Sale)
+        pre_delete.connect(signals.collect_sale_products, sender=Sale)
+        post_delete.connect(signals.update_pricing_on_sale_delete, sender=Sale)
+        for sender in (Sale.products.through, Sale.categories.through):
+            m2m_changed.connect(
+                signals.update_pricing_on_sale_rules_change, sender=sender)
+        for sender in (
+                ProductType.product_attributes.through,
+                ProductType.variant_attributes.through):
+            m2m_changed.connect(
+                signals.invalidate_attributes_cache_on_change, sender=sender)
+        for sender in (
+                ProductType.product_attributes.through,
+                ProductType.variant_attributes.through,
+                Collection.products.through):
+            m2m_changed.connect(
+                signals.invalidate_facets_on_change, sender=sender)
+        m2m_changed.connect(
+            signals.invalidate_listings_cache_on_change,
+            sender=Collection.products.through)
+
+
 class ProductAvailabilityStatus:
     NOT_PUBLISHED = 'not-published'
     VARIANTS_MISSSING = 'variants-missing'
@@ -0,0 +1,111 @@
+"""Process-wide registry of product attributes and their values."""
+from collections import defaultdict
+
+from django.utils.encoding import smart_text
+
+from ..core.utils.cache import ProcessSnapshot
+
+ATTRIBUTES_VERSION_NAME = 'product-attributes'
+
+
+class AttributeRegistry:
+    """In-memory lookups of all attributes and attribute values.
+
+    Allows to decode the hstore `attributes` of products and variants, which
+    map attribute pks to value pks, without querying the database.
+    """
+
+    def __init__(
+            self, attributes, values, product_attribute_pks=(),
+            variant_attribute_pks=()):
+        self._product_attribute_pks = set(product_attribute_pks)
+        self._variant_attribute_pks = set(variant_attribute_pks)
+        self._sorted_attributes = sorted(
+            attributes, key=lambda attribute: attribute.slug)
+        self._attributes = {
+            smart_text(attribute.pk): attribute for attribute in attributes}
+        self._attribute_pks = {
+            attribute.slug: attribute.pk for attribute in attributes}
+        self._values = {smart_text(value.pk): value for value in values}
+        self._attribute_values = defaultdict(list)
+        for value in values:
+            self._attribute_values[value.attribute_id].append(value)
+
+    def get_attributes(self):
+        return list(self._sorted_attributes)
+
+    def get_attribute(self, pk):
+        return self._attributes.get(smart_text(pk))
+
+    def get_attribute_pk(self, slug):
+        return self._attribute_pks.get(slug)
+
+    @property
+    def attribute_pks(self):
+        """Attribute pks keyed by attribute slugs."""
+        return dict(self._attribute_pks)
+
+    def is_product_attribute(self, pk):
+        """Return whether any product type uses the attribute on products."""
+        return int(pk) in self._product_attribute_pks
+
+    def is_variant_attribute(self, pk):
+        """Return whether any product type uses the attribute on variants."""
+        return int(pk) in self._variant_attribute_pks
+
+    def get_value(self, pk, attribute_pk=None):
+        """Return the value of the given pk, optionally of one attribute."""
+        value = self._values.get(smart_text(pk))
+        if attribute_pk is not None and value is not None:
+            if value.attribute_id != int(attribute_pk):
+                return None
+        return value
+
+    def get_values(self, attribute_pk):
+        return list(self._attribute_values.get(int(attribute_pk), []))
+
+    def get_value_pks(self, attribute_pk):
+        """Return value pks of an attribute keyed by value slugs."""
+        return {
+            value.slug: value.pk
+            for value in self._attribute_values.get(int(attribute_pk), [])}
+
+    def decode(self, attributes):
+        """Map attributes of a product or variant to their value objects.
+
+        Keys are attribute pks ordered by attribute slugs. Unknown
+        attributes are skipped and unknown values are kept as they are.
+        """
+        pairs = [
+            (self.get_attribute(attribute_pk), value)
+            for attribute_pk, value in attributes.items() if value]
+        pairs = sorted(
+            [(attribute, value) for attribute, value in pairs if attribute],
+            key=lambda pair: pair[0].slug)
+        return {
+            attribute.pk: self.get_value(value, attribute.pk) or value
+            for attribute, value in pairs}
+
+
+def load_attribute_registry():
+    # pylint: disable=cyclic-import
+    from .models import AttributeChoiceValue, ProductAttribute, ProductType
+
+    product_attributes = ProductType.product_attributes.through.objects
+    variant_attributes = ProductType.variant_attributes.through.objects
+    return AttributeRegistry(
+        list(ProductAttribute.objects.all()),
+        list(AttributeChoiceValue.objects.order_by('pk')),
+        product_attribute_pks=product_attributes.values_list(
+            'productattribute_id', flat=True),
+        variant_attribute_pks=variant_attributes.values_list(
+            'productattribute_id', flat=True))
+
+
+attributes_snapshot = ProcessSnapshot(
+    ATTRIBUTES_VERSION_NAME, load_attribute_registry)
+
+
+def get_attribute_registry():
+    """Return the registry of attributes shared by the current process."""
+    return attributes_snapshot.get()
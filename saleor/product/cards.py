@@ -0,0 +1,58 @@
+"""Fragment cache of product cards shown in listings."""
+import hashlib
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.encoding import smart_text
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+
+from ..core.utils.cache import get_cache_versions
+from ..discount.utils import sales_snapshot
+from .utils import get_product_version_name
+
+PRODUCT_CARD_KEY = 'product-card:%s'
+PRODUCT_CARD_TIMEOUT = 60 * 60 * 24
+
+
+def get_product_card_key(template_name, product, versions, currency=None):
+    """Return the key of a card for the product, currency and language.
+
+    The key changes when the product is saved, when the version of the
+    product is bumped, e.g. on a change of its stock or images, and when
+    sales change.
+    """
+    parts = [
+        template_name, product.pk, product.updated_at, currency,
+        get_language(), versions[sales_snapshot.name],
+        versions[get_product_version_name(product.pk)]]
+    digest = hashlib.md5(
+        '|'.join(smart_text(part) for part in parts).encode('utf-8'))
+    return PRODUCT_CARD_KEY % (digest.hexdigest(),)
+
+
+def get_product_cards(products, template_name, currency=None):
+    """Return rendered cards of products paired with their availability.
+
+    Versions of all products and their cached cards are fetched with one
+    cache query each, and only cards missing from the cache are rendered
+    and stored. The template receives `product` and `availability`.
+    """
+    products = list(products)
+    version_names = [sales_snapshot.name] + [
+        get_product_version_name(product.pk) for product, dummy in products]
+    versions = get_cache_versions(version_names)
+    keys = [
+        get_product_card_key(template_name, product, versions, currency)
+        for product, dummy in products]
+    cards = cache.get_many(keys)
+    missing = {}
+    for key, (product, availability) in zip(keys, products):
+        if key not in cards:
+            missing[key] = render_to_string(
+                template_name,
+                {'product': product, 'availability': availability})
+    if missing:
+        cache.set_many(missing, PRODUCT_CARD_TIMEOUT)
+        cards.update(missing)
+    return [mark_safe(cards[key]) for key in keys]
@@ -0,0 +1,118 @@
+"""Process-wide snapshot of the category tree."""
+from collections import defaultdict
+
+from django.db.models import Q
+from django.urls import reverse
+
+from ..core.utils.cache import ProcessSnapshot
+
+CATEGORIES_VERSION_NAME = 'categories'
+
+
+class CategoryTree:
+    """In-memory view of all categories and their relations.
+
+    Serves navigation menus, breadcrumbs and category URLs without querying
+    the database. Categories are expected in tree order, so that every
+    parent comes before its children.
+    """
+
+    def __init__(self, categories):
+        self._nodes = {}
+        self._children = defaultdict(list)
+        self._depths = {}
+        self._paths = {}
+        self._urls = {}
+        self.roots = []
+        for category in categories:
+            self._nodes[category.pk] = category
+            if category.parent_id is None:
+                self.roots.append(category)
+                depth, path = 0, category.slug
+            else:
+                self._children[category.parent_id].append(category)
+                depth = self._depths[category.parent_id] + 1
+                path = '/'.join(
+                    [self._paths[category.parent_id], category.slug])
+            self._depths[category.pk] = depth
+            self._paths[category.pk] = path
+            self._urls[category.pk] = reverse(
+                'product:category',
+                kwargs={'path': path, 'category_id': category.pk})
+
+    def __contains__(self, pk):
+        return pk in self._nodes
+
+    def get(self, pk):
+        return self._nodes.get(pk)
+
+    def get_parent(self, pk):
+        category = self._nodes.get(pk)
+        if category is None or category.parent_id is None:
+            return None
+        return self._nodes[category.parent_id]
+
+    def get_ancestors(self, pk):
+        """Return ancestors of a category, starting from its root."""
+        ancestors = []
+        parent = self.get_parent(pk)
+        while parent is not None:
+            ancestors.insert(0, parent)
+            parent = self.get_parent(parent.pk)
+        return ancestors
+
+    def get_children(self, pk):
+        return list(self._children.get(pk, []))
+
+    def get_depth(self, pk):
+        return self._depths.get(pk)
+
+    def get_full_path(self, pk):
+        return self._paths.get(pk)
+
+    def get_absolute_url(self, pk):
+        return self._urls.get(pk)
+
+
+def get_category_products_lookup(categories, prefix='category'):
+    """Return a lookup matching products within subtrees of categories.
+
+    The `prefix` leads from the queried model to the product category.
+    """
+    query = Q(pk__in=[])
+    for category in categories:
+        query |= Q(**{
+            '%s__tree_id' % prefix: category.tree_id,
+            '%s__lft__gte' % prefix: category.lft,
+            '%s__rght__lte' % prefix: category.rght})
+    return query
+
+
+def get_category_ancestors_lookup(categories):
+    """Return a lookup matching the categories and all their ancestors."""
+    query = Q(pk__in=[])
+    for category in categories:
+        query |= Q(
+            tree_id=category.tree_id, lft__lte=category.lft,
+            rght__gte=category.rght)
+    return query
+
+
+def load_category_tree():
+    # pylint: disable=cyclic-import
+    from .models import Category
+
+    return CategoryTree(Category.objects.order_by('tree_id', 'lft'))
+
+
+category_tree_snapshot = ProcessSnapshot(
+    CATEGORIES_VERSION_NAME, load_category_tree)
+
+
+def get_category_tree():
+    """Return the category tree shared by the current process."""
+    return category_tree_snapshot.get()
+
+
+def invalidate_category_tree():
+    category_tree_snapshot.invalidate()
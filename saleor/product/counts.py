@@ -0,0 +1,85 @@
+"""Maintenance of the denormalized category product counts table."""
+from celery import shared_task
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+
+from .categories import get_category_ancestors_lookup
+from .models import Category, CategoryProductCount, Product
+
+
+def get_published_products():
+    return Product.objects.filter(is_published=True).order_by()
+
+
+def get_counts_for_categories(categories):
+    """Compute unsaved count rows of the given categories in one query.
+
+    Products of descendants are counted using ranges of the MPTT `lft` and
+    `rght` columns, so no recursion over the tree is needed.
+    """
+    products = get_published_products()
+    direct = products.filter(category=OuterRef('pk')).values(
+        'category').annotate(count=Count('pk')).values('count')
+    total = products.filter(
+        category__tree_id=OuterRef('tree_id'),
+        category__lft__gte=OuterRef('lft'),
+        category__rght__lte=OuterRef('rght')).values(
+            'category__tree_id').annotate(count=Count('pk')).values('count')
+    rows = categories.annotate(
+        direct_count=Subquery(direct, output_field=IntegerField()),
+        total_count=Subquery(total, output_field=IntegerField())).values_list(
+            'pk', 'direct_count', 'total_count')
+    return [
+        CategoryProductCount(
+            category_id=pk, direct_products_count=direct_count or 0,
+            total_products_count=total_count or 0)
+        for pk, direct_count, total_count in rows]
+
+
+def update_categories_product_counts(category_ids=None):
+    """Recompute and store count rows of categories and of their ancestors.
+
+    Counts of all categories are rebuilt when no ids are given.
+    """
+    categories = Category.objects.order_by()
+    if category_ids is not None:
+        category_ids = set(category_ids) - {None}
+        if not category_ids:
+            return []
+        lookup = get_category_ancestors_lookup(
+            Category.objects.filter(pk__in=category_ids))
+        categories = categories.filter(lookup)
+    rows = get_counts_for_categories(categories)
+    with transaction.atomic():
+        counts = CategoryProductCount.objects.all()
+        if category_ids is not None:
+            counts = counts.filter(
+                category__in=[row.category_id for row in rows])
+        counts.delete()
+        CategoryProductCount.objects.bulk_create(rows)
+    return rows
+
+
+@shared_task
+def update_categories_product_counts_task():
+    update_categories_product_counts()
+
+
+def update_products_category_counts(product_ids):
+    """Refresh counts of the categories holding the given products."""
+    category_ids = Product.objects.filter(pk__in=product_ids).values_list(
+        'category_id', flat=True)
+    return update_categories_product_counts(category_ids)
+
+
+def get_categories_product_counts(category_ids, include_descendants=True):
+    """Return numbers of published products keyed by category pks.
+
+    Categories without products are not included.
+    """
+    field = (
+        'total_products_count' if include_descendants
+        else 'direct_products_count')
+    counts = CategoryProductCount.objects.filter(
+        category_id__in=category_ids).values_list('category_id', field)
+    return dict(counts)
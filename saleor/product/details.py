@@ -0,0 +1,61 @@
+"""Assembly of the data shown on product pages."""
+import datetime
+from collections import namedtuple
+
+from django.shortcuts import get_object_or_404
+
+from .utils import (
+    PRODUCT_DETAILS_QUERIES, get_availability,
+    get_availability_from_variants_prices, get_product_attributes_data,
+    get_product_images, get_variant_picker_data, get_variants_prices_map,
+    product_json_ld, products_with_details)
+
+# Queries of loading a product and assembling its page data, with the
+# attribute registry and the variant picker structure cached
+PRODUCT_DETAILS_QUERY_BUDGET = PRODUCT_DETAILS_QUERIES
+
+ProductDetails = namedtuple(
+    'ProductDetails', (
+        'product', 'is_visible', 'availability', 'variants_prices',
+        'images', 'attributes', 'show_variant_picker',
+        'variant_picker_data', 'json_ld_data'))
+
+
+def get_product_with_details(user, product_id):
+    """Return a product with everything its page shows, or raise 404."""
+    products = products_with_details(user=user, staff_view_all=True)
+    return get_object_or_404(products, id=product_id)
+
+
+def get_product_details(product, discounts=None, local_currency=None):
+    """Return data of the page of a product fetched with its details.
+
+    Prices of variants are computed once and reused by the availability,
+    the variant picker, the JSON-LD data and the add-to-cart form, which
+    should receive `variants_prices`. No queries are made as long as the
+    attribute registry and the variant picker structure are cached.
+    """
+    variants = list(product.variants.all())
+    variants_prices = get_variants_prices_map(variants, discounts)
+    if variants:
+        availability = get_availability_from_variants_prices(
+            product, variants_prices, local_currency)
+    else:
+        availability = get_availability(product, discounts, local_currency)
+    today = datetime.date.today()
+    attributes = get_product_attributes_data(product)
+    return ProductDetails(
+        product=product,
+        is_visible=(
+            product.available_on is None or product.available_on <= today),
+        availability=availability,
+        variants_prices=variants_prices,
+        images=get_product_images(product),
+        attributes=attributes,
+        # Determines if the variant picker or a select input is used
+        show_variant_picker=all(variant.attributes for variant in variants),
+        variant_picker_data=get_variant_picker_data(
+            product, discounts, local_currency,
+            variants_prices=variants_prices, availability=availability),
+        json_ld_data=product_json_ld(
+            product, attributes, variants_prices=variants_prices))
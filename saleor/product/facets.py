@@ -0,0 +1,161 @@
+"""Attribute facets of product listings."""
+from collections import defaultdict, namedtuple
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from django.utils.encoding import smart_text
+
+from ..core.utils.cache import bump_cache_version, get_cache_version
+from .attributes import ATTRIBUTES_VERSION_NAME, get_attribute_registry
+from .models import Product, ProductType, ProductVariant
+
+FACETS_VERSION_NAME = 'product-facets'
+FACETS_CACHE_KEY = 'product-facets:%s:%s:%s'
+FACETS_CACHE_TIMEOUT = 60 * 60 * 24
+
+PRODUCT_FACET = 'product'
+VARIANT_FACET = 'variant'
+
+FacetDefinitions = namedtuple(
+    'FacetDefinitions', ('product_attribute_pks', 'variant_attribute_pks'))
+
+FACET_COUNTS_SQL = """
+    SELECT %s, facet.key, facet.value, COUNT(*)
+    FROM {product} AS product, each(product.attributes) AS facet
+    WHERE product.id IN ({products})
+    GROUP BY facet.key, facet.value
+    UNION ALL
+    SELECT %s, facet.key, facet.value, COUNT(DISTINCT variant.product_id)
+    FROM {variant} AS variant, each(variant.attributes) AS facet
+    WHERE variant.product_id IN ({products})
+    GROUP BY facet.key, facet.value
+"""
+
+
+def invalidate_facets_cache():
+    bump_cache_version(FACETS_VERSION_NAME)
+
+
+def get_facets_cache_key(scope):
+    return FACETS_CACHE_KEY % (
+        scope, get_cache_version(FACETS_VERSION_NAME),
+        get_cache_version(ATTRIBUTES_VERSION_NAME))
+
+
+def build_facet_definitions(products):
+    """Return pks of attributes used by product types of the products."""
+    product_types = products.order_by().values('product_type_id')
+    product_attributes = ProductType.product_attributes.through.objects
+    variant_attributes = ProductType.variant_attributes.through.objects
+    return FacetDefinitions(
+        product_attribute_pks=sorted(set(
+            product_attributes.filter(
+                producttype_id__in=product_types).values_list(
+                    'productattribute_id', flat=True))),
+        variant_attribute_pks=sorted(set(
+            variant_attributes.filter(
+                producttype_id__in=product_types).values_list(
+                    'productattribute_id', flat=True))))
+
+
+def get_facet_definitions(scope, products):
+    """Return facet definitions of a listing, e.g. of a category.
+
+    Definitions are cached under the given `scope`, which should identify
+    the listing, until products, product types or attributes change.
+    """
+    key = get_facets_cache_key(scope)
+    definitions = cache.get(key)
+    if definitions is None:
+        definitions = build_facet_definitions(products)
+        cache.set(key, definitions, FACETS_CACHE_TIMEOUT)
+    return definitions
+
+
+def get_facet_attributes(definitions):
+    """Return visible product and variant attributes of the definitions."""
+    registry = get_attribute_registry()
+
+    def get_attributes(pks):
+        attributes = [registry.get_attribute(pk) for pk in pks]
+        return [
+            attribute for attribute in attributes
+            if attribute is not None and not attribute.hidden]
+
+    return (
+        get_attributes(definitions.product_attribute_pks),
+        get_attributes(definitions.variant_attribute_pks))
+
+
+def get_attribute_values_lookup(attribute_pk, value_pks, kinds=None):
+    """Return a lookup matching products having any of the attribute values.
+
+    Values are matched with the hstore containment operator, which can use
+    the GIN indexes of the `attributes` columns. Values of variants are
+    matched with a subquery rather than a join, so matching products do not
+    need to be made distinct. When `kinds` are not given, they are
+    guessed from the way product types use the attribute, and the variants
+    subquery is skipped for attributes used only on products.
+    """
+    if kinds is None:
+        registry = get_attribute_registry()
+        kinds = []
+        if registry.is_product_attribute(attribute_pk):
+            kinds.append(PRODUCT_FACET)
+        if registry.is_variant_attribute(attribute_pk):
+            kinds.append(VARIANT_FACET)
+    values = [
+        {smart_text(attribute_pk): smart_text(value_pk)}
+        for value_pk in value_pks]
+    query = Q(pk__in=[])
+    if PRODUCT_FACET in kinds:
+        for value in values:
+            query |= Q(attributes__contains=value)
+    if VARIANT_FACET in kinds:
+        variants_query = Q(pk__in=[])
+        for value in values:
+            variants_query |= Q(attributes__contains=value)
+        variants = ProductVariant.objects.filter(variants_query)
+        query |= Q(pk__in=variants.values('product_id'))
+    return query
+
+
+def get_attributes_lookup(attributes):
+    """Return a lookup matching products by values of many attributes.
+
+    `attributes` maps attribute pks to lists of value pks. Products must
+    have any of the values of every attribute.
+    """
+    query = Q()
+    for attribute_pk, value_pks in attributes.items():
+        query &= get_attribute_values_lookup(attribute_pk, value_pks)
+    return query
+
+
+def _to_pk(value):
+    return int(value) if value and value.isdigit() else value
+
+
+def get_facet_counts(products):
+    """Return numbers of products having each attribute value.
+
+    Counts of product and variant attributes are computed in a single
+    query and keyed by `(kind, attribute_pk, value_pk)`, where `kind` is
+    either `PRODUCT_FACET` or `VARIANT_FACET`. A product is counted once
+    per value even if many of its variants share that value.
+    """
+    products_sql, products_params = products.order_by().values(
+        'pk').query.sql_with_params()
+    sql = FACET_COUNTS_SQL.format(
+        product=Product._meta.db_table, variant=ProductVariant._meta.db_table,
+        products=products_sql)
+    params = (
+        [PRODUCT_FACET] + list(products_params) +
+        [VARIANT_FACET] + list(products_params))
+    counts = defaultdict(int)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for kind, attribute_pk, value, count in cursor.fetchall():
+            counts[kind, _to_pk(attribute_pk), _to_pk(value)] = count
+    return counts
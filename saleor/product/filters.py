@@ -1,19 +1,43 @@
 from collections import OrderedDict
 
-from django.db.models import Q
 from django.forms import CheckboxSelectMultiple, ValidationError
 from django.utils.translation import pgettext_lazy
 from django_filters import MultipleChoiceFilter, OrderingFilter, RangeFilter
 from django_prices.models import PriceField
 
 from ..core.filters import SortedFilterSet
-from .models import Product, ProductAttribute
+from .attributes import get_attribute_registry
+from .categories import get_category_products_lookup
+from .facets import (
+    PRODUCT_FACET, VARIANT_FACET, get_attribute_values_lookup,
+    get_facet_attributes, get_facet_counts, get_facet_definitions)
+from .models import Product
 
 SORT_BY_FIELDS = OrderedDict([
     ('name', pgettext_lazy('Product list sorting option', 'name')),
     ('price', pgettext_lazy('Product list sorting option', 'price'))])
 
 
+class AttributeValuesFilter(MultipleChoiceFilter):
+    """Matches products having any of the selected values of an attribute.
+
+    Uses hstore containment lookups instead of joined key lookups, so
+    results do not need to be made distinct.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.attribute_pk = kwargs.pop('attribute_pk')
+        self.kind = kwargs.pop('kind')
+        kwargs.setdefault('distinct', False)
+        super().__init__(*args, **kwargs)
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        return qs.filter(get_attribute_values_lookup(
+            self.attribute_pk, value, kinds=[self.kind]))
+
+
 class ProductFilter(SortedFilterSet):
     sort_by = OrderingFilter(
         label=pgettext_lazy('Product list sorting form', 'Sort by'),
@@ -27,61 +51,56 @@ class ProductFilter(SortedFilterSet):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        definitions = get_facet_definitions(
+            self._get_facets_scope(), self._get_facets_products())
         self.product_attributes, self.variant_attributes = (
-            self._get_attributes())
+            get_facet_attributes(definitions))
+        self.facet_counts = get_facet_counts(self.queryset)
         self.filters.update(self._get_product_attributes_filters())
         self.filters.update(self._get_product_variants_attributes_filters())
         self.filters = OrderedDict(sorted(self.filters.items()))
 
-    def _get_attributes(self):
-        q_product_attributes = self._get_product_attributes_lookup()
-        q_variant_attributes = self._get_variant_attributes_lookup()
-        product_attributes = (
-            ProductAttribute.objects.all()
-            .prefetch_related('values')
-            .filter(q_product_attributes, hidden=False)
-            .distinct())
-        variant_attributes = (
-            ProductAttribute.objects.all()
-            .prefetch_related('values')
-            .filter(q_variant_attributes, hidden=False)
-            .distinct())
-        return product_attributes, variant_attributes
-
-    def _get_product_attributes_lookup(self):
+    def _get_facets_scope(self):
+        """Return a string identifying the listing in the facets cache."""
         raise NotImplementedError()
 
-    def _get_variant_attributes_lookup(self):
+    def _get_facets_products(self):
+        """Return all products of the listing, visible or not."""
         raise NotImplementedError()
 
     def _get_product_attributes_filters(self):
         filters = {}
         for attribute in self.product_attributes:
-            choices = self._get_attribute_choices(attribute)
+            choices = self._get_attribute_choices(attribute, PRODUCT_FACET)
             if not choices:
                 continue
 
-            filters[attribute.slug] = MultipleChoiceFilter(
+            filters[attribute.slug] = AttributeValuesFilter(
                 name='attributes__%s' % attribute.pk,
                 label=attribute.name,
                 widget=CheckboxSelectMultiple,
-                choices=choices)
+                choices=choices, attribute_pk=attribute.pk,
+                kind=PRODUCT_FACET)
         return filters
 
     def _get_product_variants_attributes_filters(self):
         filters = {}
         for attribute in self.variant_attributes:
-            filters[attribute.slug] = MultipleChoiceFilter(
+            filters[attribute.slug] = AttributeValuesFilter(
                 name='variants__attributes__%s' % attribute.pk,
                 label=attribute.name,
                 widget=CheckboxSelectMultiple,
-                choices=self._get_attribute_choices(attribute))
+                choices=self._get_attribute_choices(attribute, VARIANT_FACET),
+                attribute_pk=attribute.pk, kind=VARIANT_FACET)
         return filters
 
-    def _get_attribute_choices(self, attribute):
-        return sorted([
-            (choice.pk, choice.name) for choice in attribute.values.all()
-        ], key=lambda d: d[1])
+    def _get_attribute_choices(self, attribute, kind):
+        values = get_attribute_registry().get_values(attribute.pk)
+        choices = []
+        for value in sorted(values, key=lambda value: value.name):
+            count = self.facet_counts[kind, attribute.pk, value.pk]
+            choices.append((value.pk, '%s (%d)' % (value.name, count)))
+        return choices
 
     def validate_sort_by(self, value):
         if value.strip('-') not in SORT_BY_FIELDS:
@@ -97,11 +116,12 @@ class ProductCategoryFilter(ProductFilter):
         self.category = kwargs.pop('category')
         super().__init__(*args, **kwargs)
 
-    def _get_product_attributes_lookup(self):
-        return Q(product_types__products__category=self.category)
+    def _get_facets_scope(self):
+        return 'category:%s' % (self.category.pk,)
 
-    def _get_variant_attributes_lookup(self):
-        return Q(product_variant_types__products__category=self.category)
+    def _get_facets_products(self):
+        return Product.objects.filter(
+            get_category_products_lookup([self.category]))
 
 
 class ProductCollectionFilter(ProductFilter):
@@ -109,8 +129,8 @@ class ProductCollectionFilter(ProductFilter):
         self.collection = kwargs.pop('collection')
         super().__init__(*args, **kwargs)
 
-    def _get_product_attributes_lookup(self):
-        return Q(product_types__products__collections=self.collection)
+    def _get_facets_scope(self):
+        return 'collection:%s' % (self.collection.pk,)
 
-    def _get_variant_attributes_lookup(self):
-        return Q(product_variant_types__products__collections=self.collection)
+    def _get_facets_products(self):
+        return Product.objects.filter(collections=self.collection)
@@ -10,39 +10,53 @@ from ..cart.forms import AddToCartForm
 
 class VariantChoiceField(forms.ModelChoiceField):
     discounts = None
+    variants_prices = None
 
     def label_from_instance(self, obj):
         variant_label = smart_text(obj)
+        if self.variants_prices and obj.pk in self.variants_prices:
+            price = self.variants_prices[obj.pk].price
+        else:
+            price = obj.get_price(discounts=self.discounts)
         label = pgettext_lazy(
             'Variant choice field label',
             '%(variant_label)s - %(price)s') % {
                 'variant_label': variant_label,
-                'price': gross(obj.get_price(discounts=self.discounts))}
+                'price': gross(price)}
         return label
 
-    def update_field_data(self, variants, cart):
-        """Initialize variant picker metadata."""
+    def update_field_data(self, variants, cart, variants_prices=None):
+        """Initialize variant picker metadata.
+
+        Labels show prices from `variants_prices`, a map of variant pks to
+        `VariantPrices`, when given.
+        """
         self.queryset = variants
         self.discounts = cart.discounts
+        self.variants_prices = variants_prices
         self.empty_label = None
+        # Evaluating `all()` reuses variants fetched by prefetch_related
+        all_variants = variants.all()
         images_map = {
             variant.pk: [
                 vi.image.image.url for vi in variant.variant_images.all()]
-            for variant in variants.all()}
+            for variant in all_variants}
         self.widget.attrs['data-images'] = json.dumps(images_map)
         # Don't display select input if there are less than two variants
-        if self.queryset.count() < 2:
+        if len(all_variants) < 2:
             self.widget = forms.HiddenInput(
-                {'value': variants.all()[0].pk})
+                {'value': all_variants[0].pk})
 
 
 class ProductForm(AddToCartForm):
     variant = VariantChoiceField(queryset=None)
 
     def __init__(self, *args, **kwargs):
+        variants_prices = kwargs.pop('variants_prices', None)
         super().__init__(*args, **kwargs)
         variant_field = self.fields['variant']
-        variant_field.update_field_data(self.product.variants, self.cart)
+        variant_field.update_field_data(
+            self.product.variants, self.cart, variants_prices)
 
     def get_variant(self, cleaned_data):
         return cleaned_data.get('variant')
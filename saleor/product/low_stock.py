@@ -0,0 +1,90 @@
+"""Maintenance of the denormalized low stock tables."""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+
+from .models import LowStockProduct, LowStockVariant, Product, ProductVariant
+
+
+def get_low_stock_threshold():
+    return getattr(settings, 'LOW_STOCK_THRESHOLD', 10)
+
+
+def update_variants_low_stock(variant_ids=None):
+    """Recompute and store low stock rows of variants and of their products.
+
+    Relies on quantities stored in variants, so it has to be called after
+    `saleor.product.pricing.update_variants_quantity_available`. Rows of all
+    variants and products are rebuilt when no ids are given.
+    """
+    threshold = get_low_stock_threshold()
+    with transaction.atomic():
+        variants = ProductVariant.objects.order_by('pk')
+        if variant_ids is not None:
+            # Concurrent refreshes of the same variants wait for each other
+            # instead of inserting the same rows
+            variant_ids = list(variant_ids)
+            variants = variants.filter(pk__in=variant_ids).select_for_update()
+        variants = list(variants.values_list(
+            'pk', 'product_id', 'quantity_available'))
+        rows = [
+            LowStockVariant(
+                variant_id=pk, product_id=product_id,
+                quantity_available=quantity)
+            for pk, product_id, quantity in variants
+            if quantity <= threshold]
+        low_stock = LowStockVariant.objects.all()
+        if variant_ids is not None:
+            low_stock = low_stock.filter(variant_id__in=variant_ids)
+        low_stock.delete()
+        LowStockVariant.objects.bulk_create(rows)
+        product_ids = None
+        if variant_ids is not None:
+            product_ids = set(
+                product_id for dummy, product_id, dummy in variants)
+        update_products_low_stock(product_ids)
+    return rows
+
+
+def update_products_low_stock(product_ids=None):
+    """Recompute and store low stock rows of the given products.
+
+    A product is low in stock when its variants have no more than the
+    threshold available in total. Products without variants are skipped.
+    Rows of all products are rebuilt when no ids are given.
+    """
+    threshold = get_low_stock_threshold()
+    with transaction.atomic():
+        variants = ProductVariant.objects.order_by()
+        if product_ids is not None:
+            # Products are locked in the order of pks, so refreshes of
+            # sibling variants in concurrent transactions run one after
+            # another and the later one sees the quantities of the earlier
+            product_ids = list(
+                Product.objects.filter(pk__in=set(product_ids)).order_by(
+                    'pk').select_for_update().values_list('pk', flat=True))
+            if not product_ids:
+                return []
+            variants = variants.filter(product_id__in=product_ids)
+        totals = variants.values('product_id').annotate(
+            total=Sum('quantity_available')).filter(total__lte=threshold)
+        rows = [
+            LowStockProduct(product_id=product_id, quantity_available=total)
+            for product_id, total in totals.values_list(
+                'product_id', 'total')]
+        low_stock = LowStockProduct.objects.all()
+        if product_ids is not None:
+            low_stock = low_stock.filter(product_id__in=product_ids)
+        low_stock.delete()
+        LowStockProduct.objects.bulk_create(rows)
+    return rows
+
+
+def get_low_stock_products():
+    """Return products low in stock, the lowest first.
+
+    Products are annotated with the `total_stock` they have available.
+    """
+    return Product.objects.filter(low_stock__isnull=False).annotate(
+        total_stock=F('low_stock__quantity_available')).order_by(
+            'total_stock', 'pk')
@@ -0,0 +1,12 @@
+from django.core.management import BaseCommand
+
+from ...counts import update_categories_product_counts
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized product counts of all categories'
+
+    def handle(self, *args, **options):
+        rows = update_categories_product_counts()
+        self.stdout.write(
+            'Updated product counts of %d categories' % (len(rows),))
@@ -0,0 +1,14 @@
+from django.core.management import BaseCommand
+
+from ...low_stock import update_variants_low_stock
+from ...models import LowStockProduct
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized low stock tables of variants and products'
+
+    def handle(self, *args, **options):
+        rows = update_variants_low_stock()
+        self.stdout.write(
+            'Found %d variants and %d products low in stock' % (
+                len(rows), LowStockProduct.objects.count()))
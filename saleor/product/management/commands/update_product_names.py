@@ -0,0 +1,28 @@
+from django.core.management import BaseCommand
+
+from ...models import Product, ProductVariant
+from ...utils import update_products_slugs, update_variants_display_names
+
+
+class Command(BaseCommand):
+    help = 'Backfill stored product slugs and variant display names'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of objects updated per batch')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        products = Product.objects.order_by('pk').only('pk', 'name', 'slug')
+        updated_products = sum(
+            update_products_slugs(products[start:start + batch_size])
+            for start in range(0, products.count(), batch_size))
+        variants = ProductVariant.objects.order_by('pk').only(
+            'pk', 'attributes', 'display_name')
+        updated_variants = sum(
+            update_variants_display_names(variants[start:start + batch_size])
+            for start in range(0, variants.count(), batch_size))
+        self.stdout.write(
+            'Updated slugs of %d products and display names of %d variants' % (
+                updated_products, updated_variants))
@@ -0,0 +1,29 @@
+from django.core.management import BaseCommand
+
+from ...models import Product, ProductVariant
+from ...pricing import (
+    update_products_pricing, update_variants_quantity_available)
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the denormalized pricing of all products and the stock '
+        'quantities of their variants')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of products priced per batch')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        product_ids = list(
+            Product.objects.order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(product_ids), batch_size):
+            batch = product_ids[start:start + batch_size]
+            update_variants_quantity_available(
+                ProductVariant.objects.filter(
+                    product_id__in=batch).values('pk'))
+            update_products_pricing(Product.objects.filter(pk__in=batch))
+        self.stdout.write(
+            'Updated pricing of %d products' % (len(product_ids),))
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 2.0.3 on 2018-03-12 10:12
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django_prices.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0053_auto_20180215_1303'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductPricing',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='pricing', serialize=False, to='product.Product')),
+                ('price_min', django_prices.models.PriceField(currency='EUR', decimal_places=2, max_digits=12)),
+                ('price_max', django_prices.models.PriceField(currency='EUR', decimal_places=2, max_digits=12)),
+                ('discounted_price_min', django_prices.models.PriceField(currency='EUR', db_index=True, decimal_places=2, max_digits=12)),
+                ('discounted_price_max', django_prices.models.PriceField(currency='EUR', decimal_places=2, max_digits=12)),
+                ('is_in_stock', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 2.0.3 on 2018-03-12 14:20
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0054_productpricing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='slug',
+            field=models.SlugField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='productvariant',
+            name='display_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
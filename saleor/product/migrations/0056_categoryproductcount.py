@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 2.0.3 on 2018-03-12 14:27
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+import django.db.models.deletion
+
+
+def populate_product_counts(apps, schema_editor):
+    Category = apps.get_model('product', 'Category')
+    CategoryProductCount = apps.get_model('product', 'CategoryProductCount')
+    Product = apps.get_model('product', 'Product')
+    products = Product.objects.filter(is_published=True).order_by()
+    direct = products.filter(category=OuterRef('pk')).values(
+        'category').annotate(count=Count('pk')).values('count')
+    total = products.filter(
+        category__tree_id=OuterRef('tree_id'),
+        category__lft__gte=OuterRef('lft'),
+        category__rght__lte=OuterRef('rght')).values(
+            'category__tree_id').annotate(count=Count('pk')).values('count')
+    rows = Category.objects.order_by().annotate(
+        direct_count=Subquery(direct, output_field=models.IntegerField()),
+        total_count=Subquery(
+            total, output_field=models.IntegerField())).values_list(
+                'pk', 'direct_count', 'total_count')
+    CategoryProductCount.objects.bulk_create([
+        CategoryProductCount(
+            category_id=pk, direct_products_count=direct_count or 0,
+            total_products_count=total_count or 0)
+        for pk, direct_count, total_count in rows])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0055_product_slug_variant_display_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryProductCount',
+            fields=[
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='product_count', serialize=False, to='product.Category')),
+                ('direct_products_count', models.PositiveIntegerField(default=0)),
+                ('total_products_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(
+            populate_product_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 2.0.3 on 2018-03-12 17:20
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def update_quantity_available(apps, schema_editor):
+    ProductVariant = apps.get_model('product', 'ProductVariant')
+    Stock = apps.get_model('product', 'Stock')
+    available = Stock.objects.filter(
+        variant=OuterRef('pk'), quantity__gt=F('quantity_allocated'))
+    available = available.order_by().values('variant').annotate(
+        total=Sum(F('quantity') - F('quantity_allocated'))).values('total')
+    ProductVariant.objects.update(
+        quantity_available=Coalesce(
+            Subquery(available, output_field=models.IntegerField()), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0057_attributes_gin_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productvariant',
+            name='quantity_available',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(
+            update_quantity_available, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 2.0.3 on 2018-03-12 18:02
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+import django.db.models.deletion
+
+
+def populate_low_stock(apps, schema_editor):
+    ProductVariant = apps.get_model('product', 'ProductVariant')
+    LowStockProduct = apps.get_model('product', 'LowStockProduct')
+    LowStockVariant = apps.get_model('product', 'LowStockVariant')
+    threshold = getattr(settings, 'LOW_STOCK_THRESHOLD', 10)
+    variants = ProductVariant.objects.order_by()
+    LowStockVariant.objects.bulk_create([
+        LowStockVariant(
+            variant_id=pk, product_id=product_id,
+            quantity_available=quantity)
+        for pk, product_id, quantity in variants.filter(
+            quantity_available__lte=threshold).values_list(
+                'pk', 'product_id', 'quantity_available')])
+    totals = variants.values('product_id').annotate(
+        total=Sum('quantity_available')).filter(total__lte=threshold)
+    LowStockProduct.objects.bulk_create([
+        LowStockProduct(product_id=product_id, quantity_available=total)
+        for product_id, total in totals.values_list('product_id', 'total')])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0059_variant_quantity_available'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LowStockProduct',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='low_stock', serialize=False, to='product.Product')),
+                ('quantity_available', models.IntegerField(db_index=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LowStockVariant',
+            fields=[
+                ('variant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='low_stock', serialize=False, to='product.ProductVariant')),
+                ('quantity_available', models.IntegerField(db_index=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='low_stock_variants', to='product.Product')),
+            ],
+        ),
+        migrations.RunPython(populate_low_stock, migrations.RunPython.noop),
+    ]
@@ -4,9 +4,11 @@ from decimal import Decimal
 from celery import shared_task
 from django.conf import settings
 from django.contrib.postgres.fields import HStoreField
+from django.contrib.postgres.indexes import GinIndex
 from django.core.validators import MinValueValidator, RegexValidator
 from django.db import models
 from django.db.models import F, Max, Q
+from django.db.models.functions import Coalesce
 from django.urls import reverse
 from django.utils.encoding import smart_text
 from django.utils.text import slugify
@@ -21,6 +23,9 @@ from versatileimagefield.fields import PPOIField, VersatileImageField
 
 from ..core.utils.warmer import ProductWarmer, CategoryWarmer
 from ..discount.utils import calculate_discounted_price
+from .price_engine import get_variants_price_range
+from .attributes import get_attribute_registry
+from .categories import get_category_tree
 from .utils import get_attributes_display_map
 
 
@@ -53,6 +58,10 @@ class Category(MPTTModel):
         CategoryWarmer(items=[self])()
 
     def get_absolute_url(self, ancestors=None):
+        if not ancestors:
+            url = get_category_tree().get_absolute_url(self.pk)
+            if url is not None:
+                return url
         return reverse('product:category',
                        kwargs={'path': self.get_full_path(ancestors),
                                'category_id': self.id})
@@ -61,6 +70,9 @@ class Category(MPTTModel):
         if not self.parent_id:
             return self.slug
         if not ancestors:
+            path = get_category_tree().get_full_path(self.pk)
+            if path is not None:
+                return path
             ancestors = self.get_ancestors()
         nodes = [node for node in ancestors] + [self]
         return '/'.join([node.slug for node in nodes])
@@ -94,6 +106,25 @@ class ProductQuerySet(models.QuerySet):
             Q(available_on__lte=today) | Q(available_on__isnull=True),
             Q(is_published=True))
 
+    def annotate_effective_price(self):
+        """Annotate products with their lowest price under active sales.
+
+        Falls back to the base price for products without a pricing row.
+        Prices are annotated as plain amounts, so they can be serialized,
+        e.g. in pagination cursors.
+        """
+        return self.annotate(effective_price=Coalesce(
+            'pricing__discounted_price_min', 'price',
+            output_field=models.DecimalField(
+                max_digits=12, decimal_places=2)))
+
+    def in_stock(self):
+        """Return products having any variant in stock.
+
+        Relies on the stock flag of the pricing rows of products.
+        """
+        return self.filter(pricing__is_in_stock=True)
+
 
 AVAILABILITY_MSG_FROM_TO = gettext_lazy(
     'This product is available within %(from)d to %(to)d days.')
@@ -106,6 +137,7 @@ class Product(models.Model, ItemRange):
     product_type = models.ForeignKey(
         ProductType, related_name='products', on_delete=models.CASCADE)
     name = models.CharField(max_length=128)
+    slug = models.SlugField(max_length=255, blank=True)
     description = models.TextField()
     category = models.ForeignKey(
         Category, related_name='products', on_delete=models.CASCADE)
@@ -121,6 +153,8 @@ class Product(models.Model, ItemRange):
 
     class Meta:
         app_label = 'product'
+        indexes = [
+            GinIndex(fields=['attributes'], name='product_attributes_gin')]
         permissions = (
             ('view_product',
              pgettext_lazy('Permission description', 'Can view products')),
@@ -146,14 +180,28 @@ class Product(models.Model, ItemRange):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.slug = self.generate_slug()
+        update_fields = kwargs.get('update_fields')
+        if update_fields:
+            update_fields = set(update_fields) | {'updated_at'}
+            if 'name' in update_fields:
+                update_fields.add('slug')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
     def get_absolute_url(self):
         return reverse(
             'product:details',
             kwargs={'slug': self.get_slug(), 'product_id': self.id})
 
-    def get_slug(self):
+    def generate_slug(self):
         return slugify(smart_text(unidecode(self.name)))
 
+    def get_slug(self):
+        # Rows saved before slugs were stored have to compute them
+        return self.slug or self.generate_slug()
+
     def is_in_stock(self):
         return any(variant.is_in_stock() for variant in self)
 
@@ -172,8 +220,10 @@ class Product(models.Model, ItemRange):
         self.attributes[smart_text(pk)] = smart_text(value_pk)
 
     def get_price_range(self, discounts=None, **kwargs):
-        if self.variants.exists():
-            return super().get_price_range(discounts=discounts, **kwargs)
+        # Evaluating `all()` reuses variants fetched by prefetch_related
+        variants = self.variants.all()
+        if variants:
+            return get_variants_price_range(variants, discounts=discounts)
         price = calculate_discounted_price(
             self, self.price, discounts, **kwargs)
         return PriceRange(price, price)
@@ -242,6 +292,81 @@ class Product(models.Model, ItemRange):
         return self.get_availability_range()
 
 
+class ProductPricing(models.Model):
+    """Denormalized prices and stock status of a product used by listings.
+
+    Kept up to date by `saleor.product.pricing` whenever the product, its
+    variants, its stock or the active sales change.
+    """
+
+    product = models.OneToOneField(
+        Product, primary_key=True, related_name='pricing',
+        on_delete=models.CASCADE)
+    price_min = PriceField(
+        currency=settings.DEFAULT_CURRENCY, max_digits=12, decimal_places=2)
+    price_max = PriceField(
+        currency=settings.DEFAULT_CURRENCY, max_digits=12, decimal_places=2)
+    discounted_price_min = PriceField(
+        currency=settings.DEFAULT_CURRENCY, max_digits=12, decimal_places=2,
+        db_index=True)
+    discounted_price_max = PriceField(
+        currency=settings.DEFAULT_CURRENCY, max_digits=12, decimal_places=2)
+    is_in_stock = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        app_label = 'product'
+
+    def __str__(self):
+        return smart_text(self.product_id)
+
+    @property
+    def price_range(self):
+        return PriceRange(self.price_min, self.price_max)
+
+    @property
+    def discounted_price_range(self):
+        return PriceRange(self.discounted_price_min, self.discounted_price_max)
+
+
+class CategoryProductCount(models.Model):
+    """Denormalized numbers of published products within a category.
+
+    Kept up to date by `saleor.product.counts` whenever products are
+    published, unpublished, moved or deleted and when categories change.
+    """
+
+    category = models.OneToOneField(
+        Category, primary_key=True, related_name='product_count',
+        on_delete=models.CASCADE)
+    direct_products_count = models.PositiveIntegerField(default=0)
+    total_products_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        app_label = 'product'
+
+    def __str__(self):
+        return smart_text(self.category_id)
+
+
+class LowStockProduct(models.Model):
+    """Products whose total quantity available is low.
+
+    Kept up to date by `saleor.product.low_stock` whenever stock changes.
+    """
+
+    product = models.OneToOneField(
+        Product, primary_key=True, related_name='low_stock',
+        on_delete=models.CASCADE)
+    quantity_available = models.IntegerField(db_index=True)
+
+    class Meta:
+        app_label = 'product'
+
+    def __str__(self):
+        return smart_text(self.product_id)
+
+
 class ProductVariant(models.Model, Item):
     sku = models.CharField(max_length=32, unique=True)
     name = models.CharField(max_length=100, blank=True)
@@ -251,13 +376,41 @@ class ProductVariant(models.Model, Item):
     product = models.ForeignKey(
         Product, related_name='variants', on_delete=models.CASCADE)
     attributes = HStoreField(default={})
+    display_name = models.CharField(max_length=255, blank=True)
     images = models.ManyToManyField('ProductImage', through='VariantImage')
+    # Sum of quantities available in stock rows, maintained by
+    # `saleor.product.pricing.update_variants_quantity_available`
+    quantity_available = models.IntegerField(default=0, editable=False)
 
     class Meta:
         app_label = 'product'
+        indexes = [
+            GinIndex(fields=['attributes'], name='variant_attributes_gin')]
 
     def __str__(self):
-        return self.name or self.display_variant_attributes()
+        return (
+            self.name or self.display_name or
+            self.display_variant_attributes())
+
+    def save(self, *args, **kwargs):
+        self.display_name = self.generate_display_name()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'attributes' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'display_name'}
+        elif (update_fields is None and self.pk is not None and
+              not self._state.adding and not kwargs.get('force_insert')):
+            # The stored stock quantity is only written by stock updates,
+            # so a value loaded before them is not saved back
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and
+                field.name != 'quantity_available']
+        super().save(*args, **kwargs)
+
+    def generate_display_name(self):
+        display_name = self.display_variant_attributes()
+        max_length = self._meta.get_field('display_name').max_length
+        return display_name[:max_length]
 
     def check_quantity(self, quantity):
         total_available_quantity = self.get_stock_quantity()
@@ -265,7 +418,7 @@ class ProductVariant(models.Model, Item):
             raise InsufficientStock(self)
 
     def get_stock_quantity(self):
-        return sum([stock.quantity_available for stock in self.stock.all()])
+        return self.quantity_available
 
     def get_price_per_item(self, discounts=None, **kwargs):
         price = self.price_override or self.product.price
@@ -290,8 +443,7 @@ class ProductVariant(models.Model, Item):
         return self.product.product_type.is_shipping_required
 
     def is_in_stock(self):
-        return any(
-            [stock.quantity_available > 0 for stock in self.stock.all()])
+        return self.quantity_available > 0
 
     def get_attribute(self, pk):
         return self.attributes.get(smart_text(pk))
@@ -300,12 +452,11 @@ class ProductVariant(models.Model, Item):
         self.attributes[smart_text(pk)] = smart_text(value_pk)
 
     def display_variant_attributes(self, attributes=None):
-        if attributes is None:
-            attributes = self.product.product_type.variant_attributes.all()
+        registry = get_attribute_registry()
         values = get_attributes_display_map(self, attributes)
         if values:
             return ', '.join(
-                ['%s: %s' % (smart_text(attributes.get(id=int(key))),
+                ['%s: %s' % (smart_text(registry.get_attribute(key)),
                              smart_text(value))
                  for (key, value) in values.items()])
         return ''
@@ -340,6 +491,26 @@ class ProductVariant(models.Model, Item):
         return None
 
 
+class LowStockVariant(models.Model):
+    """Variants whose quantity available is low.
+
+    Kept up to date by `saleor.product.low_stock` whenever stock changes.
+    """
+
+    variant = models.OneToOneField(
+        ProductVariant, primary_key=True, related_name='low_stock',
+        on_delete=models.CASCADE)
+    product = models.ForeignKey(
+        Product, related_name='low_stock_variants', on_delete=models.CASCADE)
+    quantity_available = models.IntegerField(db_index=True)
+
+    class Meta:
+        app_label = 'product'
+
+    def __str__(self):
+        return smart_text(self.variant_id)
+
+
 class StockLocation(models.Model):
     name = models.CharField(max_length=100)
 
@@ -0,0 +1,19 @@
+"""Cache versions and validators of storefront catalog pages."""
+from ..core.utils.exchange_rates import exchange_rates_snapshot
+from ..discount.utils import sales_snapshot
+from .attributes import ATTRIBUTES_VERSION_NAME
+from .categories import CATEGORIES_VERSION_NAME
+from .facets import FACETS_VERSION_NAME
+from .utils import LISTINGS_VERSION_NAME, get_product_version_name
+
+# Versions of data shown on all catalog pages, such as navigation or prices
+CATALOG_VERSION_NAMES = (
+    sales_snapshot.name, exchange_rates_snapshot.name,
+    CATEGORIES_VERSION_NAME, ATTRIBUTES_VERSION_NAME)
+
+LISTING_VERSION_NAMES = CATALOG_VERSION_NAMES + (
+    LISTINGS_VERSION_NAME, FACETS_VERSION_NAME)
+
+
+def get_product_page_version_name(product_id, **kwargs):
+    return get_product_version_name(product_id)
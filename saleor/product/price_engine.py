@@ -0,0 +1,99 @@
+"""Batch pricing of product variants.
+
+Prices of many variants are computed at once on plain `Decimal` amounts
+instead of building a chain of price modifiers for every single item. The
+results match those of `ProductVariant.get_price_per_item` and of the tax
+helpers in `core.utils.billing`.
+"""
+from collections import namedtuple
+from decimal import Decimal
+
+from prices import Price, PriceRange
+
+from ..core.utils.billing import get_taxed_amounts
+from ..discount import DiscountValueType
+from ..discount.utils import SaleIndex
+
+CENTS = Decimal('0.01')
+
+VariantPrices = namedtuple(
+    'VariantPrices', (
+        'price', 'price_undiscounted', 'taxed_price',
+        'taxed_price_undiscounted'))
+
+
+def apply_sale(amount, sale):
+    """Return the amount reduced by the sale, as `prices` modifiers do."""
+    if sale.type == DiscountValueType.FIXED:
+        return max(amount - sale.value, 0)
+    elif sale.type == DiscountValueType.PERCENTAGE:
+        factor = Decimal(sale.value) / 100
+        return amount - (amount * factor).quantize(CENTS)
+    raise NotImplementedError('Unknown discount type')
+
+
+def get_discounted_amounts(products, amounts, discounts):
+    """Return amounts reduced by the best sale applicable to each product."""
+    if not discounts:
+        return list(amounts)
+    if not isinstance(discounts, SaleIndex):
+        discounts = SaleIndex(discounts)
+    discounted = []
+    product_sales = {}
+    for product, amount in zip(products, amounts):
+        if product.pk not in product_sales:
+            product_sales[product.pk] = discounts.get_sales_for_product(
+                product)
+        sales = product_sales[product.pk]
+        if sales:
+            amount = min(apply_sale(amount, sale) for sale in sales)
+        discounted.append(amount)
+    return discounted
+
+
+def get_variants_prices(
+        variants, discounts=None, country=None, include_taxes=True):
+    """Return `VariantPrices` of the given variants, in the same order.
+
+    Variants are expected to have their products fetched beforehand. Taxed
+    prices are left empty unless `include_taxes` is set.
+    """
+    variants = list(variants)
+    if not variants:
+        return []
+    base_prices = [
+        variant.price_override or variant.product.price
+        for variant in variants]
+    products = [variant.product for variant in variants]
+    amounts = [price.net for price in base_prices]
+    discounted = get_discounted_amounts(products, amounts, discounts)
+    if include_taxes:
+        taxed = get_taxed_amounts(amounts, country)
+        taxed_discounted = get_taxed_amounts(discounted, country)
+    else:
+        taxed = taxed_discounted = [None] * len(variants)
+    results = []
+    rows = zip(base_prices, amounts, discounted, taxed, taxed_discounted)
+    for base, net, discounted_net, gross, discounted_gross in rows:
+        currency = base.currency
+        results.append(VariantPrices(
+            price=Price(net=discounted_net, currency=currency),
+            price_undiscounted=Price(net=net, currency=currency),
+            taxed_price=get_taxed_price(
+                discounted_net, discounted_gross, currency),
+            taxed_price_undiscounted=get_taxed_price(net, gross, currency)))
+    return results
+
+
+def get_taxed_price(net, gross, currency):
+    if gross is None:
+        return None
+    return Price(net=net, gross=gross, currency=currency)
+
+
+def get_variants_price_range(variants, discounts=None):
+    """Return the range of (discounted) prices of the given variants."""
+    prices = [
+        variant_prices.price for variant_prices in get_variants_prices(
+            variants, discounts=discounts, include_taxes=False)]
+    return PriceRange(min(prices), max(prices))
@@ -0,0 +1,125 @@
+"""Maintenance of the denormalized product pricing table."""
+from decimal import Decimal
+
+from celery import shared_task
+from django.db import transaction
+from django.db.models import F, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from ..discount.utils import get_sale_index
+from .categories import get_category_products_lookup
+from .models import (
+    Category, Product, ProductPricing, ProductVariant, Stock)
+from .utils import invalidate_listings_cache
+
+CENTS = Decimal('0.01')
+
+
+def products_with_stock_in(products):
+    """Return ids of the given products that have any stock available."""
+    variants = ProductVariant.objects.filter(
+        product__in=products, quantity_available__gt=0)
+    return set(variants.values_list('product_id', flat=True))
+
+
+def update_variants_quantity_available(variant_ids):
+    """Store the quantity available in stock of the given variants.
+
+    Quantities are summed and stored with a single UPDATE. Has to be called
+    whenever stock rows change, which the stock signal handlers and
+    `saleor.product.utils.refresh_stock_products` do.
+    """
+    available = Stock.objects.filter(
+        variant=OuterRef('pk'), quantity__gt=F('quantity_allocated'))
+    available = available.order_by().values('variant').annotate(
+        total=Sum(F('quantity') - F('quantity_allocated'))).values('total')
+    ProductVariant.objects.filter(pk__in=variant_ids).update(
+        quantity_available=Coalesce(
+            Subquery(available, output_field=IntegerField()), 0))
+
+
+def get_pricing_for_product(product, discounts):
+    """Compute an unsaved pricing row of the given product.
+
+    Variants are expected to be prefetched when pricing many products at
+    once.
+    """
+    price_range = product.get_price_range()
+    discounted_price_range = product.get_price_range(discounts=discounts)
+    return ProductPricing(
+        product=product,
+        price_min=price_range.min_price.quantize(CENTS),
+        price_max=price_range.max_price.quantize(CENTS),
+        discounted_price_min=discounted_price_range.min_price.quantize(CENTS),
+        discounted_price_max=discounted_price_range.max_price.quantize(CENTS),
+        is_in_stock=product.is_in_stock())
+
+
+def update_product_pricing(product, discounts=None):
+    """Recompute and store the pricing row of a single product."""
+    if discounts is None:
+        discounts = get_sale_index()
+    pricing = get_pricing_for_product(product, discounts)
+    ProductPricing.objects.update_or_create(
+        product=product, defaults={
+            'price_min': pricing.price_min,
+            'price_max': pricing.price_max,
+            'discounted_price_min': pricing.discounted_price_min,
+            'discounted_price_max': pricing.discounted_price_max,
+            'is_in_stock': pricing.is_in_stock})
+    return pricing
+
+
+def update_products_pricing(products, discounts=None):
+    """Recompute and store pricing rows of many products.
+
+    Rows are replaced in bulk, so the number of queries does not depend on
+    the number of products.
+    """
+    if discounts is None:
+        discounts = get_sale_index()
+    products = products.select_related('category').prefetch_related(
+        'variants')
+    rows = [get_pricing_for_product(product, discounts)
+            for product in products]
+    with transaction.atomic():
+        ProductPricing.objects.filter(
+            product__in=[row.product_id for row in rows]).delete()
+        ProductPricing.objects.bulk_create(rows)
+    invalidate_listings_cache()
+    return rows
+
+
+def update_products_stock_status(product_ids):
+    """Refresh the in-stock flag of the given products.
+
+    Cheaper than a full refresh as stock changes do not affect prices.
+    Product listings are invalidated only when a flag actually changes.
+    """
+    in_stock = products_with_stock_in(product_ids)
+    pricings = ProductPricing.objects.filter(product_id__in=product_ids)
+    changed = pricings.filter(
+        product_id__in=in_stock, is_in_stock=False).update(is_in_stock=True)
+    changed += pricings.exclude(product_id__in=in_stock).filter(
+        is_in_stock=True).update(is_in_stock=False)
+    if changed:
+        invalidate_listings_cache()
+    return changed
+
+
+@shared_task
+def update_products_pricing_task(product_ids):
+    update_products_pricing(Product.objects.filter(pk__in=product_ids))
+
+
+def get_sale_product_ids(sale):
+    """Return ids of all products a sale applies to."""
+    lookup = Q(sale=sale) | get_category_products_lookup(
+        sale.categories.all())
+    return set(Product.objects.filter(lookup).values_list('pk', flat=True))
+
+
+def get_category_product_ids(category_ids):
+    categories = Category.objects.filter(pk__in=category_ids)
+    lookup = get_category_products_lookup(categories)
+    return set(Product.objects.filter(lookup).values_list('pk', flat=True))
@@ -0,0 +1,220 @@
+from django.db import transaction
+from django.utils.encoding import smart_text
+
+from ..discount.models import Sale
+from .categories import invalidate_category_tree
+from .counts import (
+    update_categories_product_counts,
+    update_categories_product_counts_task)
+from .facets import invalidate_facets_cache
+from .low_stock import update_products_low_stock, update_variants_low_stock
+from .models import Product, ProductVariant, Stock
+from .pricing import (
+    get_category_product_ids, get_sale_product_ids, update_product_pricing,
+    update_products_pricing_task, update_products_stock_status,
+    update_variants_quantity_available)
+from .utils import (
+    invalidate_attributes_cache, invalidate_listings_cache,
+    invalidate_products_cache, update_variants_display_names)
+
+
+def schedule_pricing_update(product_ids):
+    product_ids = list(product_ids)
+    if product_ids:
+        transaction.on_commit(
+            lambda: update_products_pricing_task.delay(product_ids))
+
+
+def update_pricing_on_product_change(sender, instance, **kwargs):
+    update_product_pricing(instance)
+
+
+def update_existing_product_pricing(product_id):
+    product = Product.objects.filter(pk=product_id).first()
+    if product is not None:
+        update_product_pricing(product)
+
+
+def update_pricing_on_variant_change(sender, instance, **kwargs):
+    update_existing_product_pricing(instance.product_id)
+
+
+def update_pricing_on_variant_delete(sender, instance, **kwargs):
+    # Variants of a product being deleted are deleted before the product
+    # and after its pricing row, so pricing is refreshed once committed
+    product_id = instance.product_id
+    transaction.on_commit(
+        lambda: update_existing_product_pricing(product_id))
+
+
+def update_variant_stock_status(variant_id):
+    """Refresh stock data of a variant and of its product if they exist.
+
+    Return the product id and the quantity available of the variant.
+    """
+    update_variants_quantity_available([variant_id])
+    update_variants_low_stock([variant_id])
+    rows = list(ProductVariant.objects.filter(pk=variant_id).values_list(
+        'product_id', 'quantity_available'))
+    product_ids = [product_id for product_id, dummy in rows]
+    update_products_stock_status(product_ids)
+    invalidate_products_cache(product_ids)
+    return rows[0] if rows else None
+
+
+def update_stock_status_on_stock_change(sender, instance, **kwargs):
+    row = update_variant_stock_status(instance.variant_id)
+    # Keep the variant the stock row was saved with up to date
+    if row is not None and Stock.variant.is_cached(instance):
+        instance.variant.quantity_available = row[1]
+
+
+def update_stock_status_on_stock_delete(sender, instance, **kwargs):
+    # Stock is deleted in cascade with variants and products after their
+    # low stock rows, which must not be recreated, so it is refreshed once
+    # the deletion is committed
+    variant_id = instance.variant_id
+    transaction.on_commit(lambda: update_variant_stock_status(variant_id))
+
+
+def update_low_stock_on_variant_create(sender, instance, created, **kwargs):
+    if created:
+        update_variants_low_stock([instance.pk])
+
+
+def update_low_stock_on_variant_delete(sender, instance, **kwargs):
+    product_id = instance.product_id
+    transaction.on_commit(lambda: update_products_low_stock([product_id]))
+
+
+def invalidate_product_cache_on_product_change(sender, instance, **kwargs):
+    invalidate_products_cache([instance.pk])
+    invalidate_listings_cache()
+
+
+def invalidate_product_cache_on_related_change(sender, instance, **kwargs):
+    # Variants and images of a product
+    invalidate_products_cache([instance.product_id])
+    invalidate_listings_cache()
+
+
+def invalidate_listings_cache_on_change(sender, **kwargs):
+    action = kwargs.get('action')
+    if action is None or action.startswith('post_'):
+        invalidate_listings_cache()
+
+
+def invalidate_attributes_cache_on_change(sender, **kwargs):
+    action = kwargs.get('action')
+    if action is None or action.startswith('post_'):
+        invalidate_attributes_cache()
+
+
+def collect_product_state(sender, instance, **kwargs):
+    if instance.pk is None:
+        instance._previous_state = None
+        return
+    instance._previous_state = Product.objects.filter(
+        pk=instance.pk).values_list(
+            'category_id', 'is_published', 'product_type_id').first()
+
+
+def update_category_counts_on_product_change(
+        sender, instance, created, **kwargs):
+    previous_state = getattr(instance, '_previous_state', None)
+    state = (instance.category_id, instance.is_published)
+    if previous_state and previous_state[:2] == state and not created:
+        return
+    category_ids = {instance.category_id}
+    if previous_state is not None:
+        category_ids.add(previous_state[0])
+    update_categories_product_counts(category_ids)
+
+
+def invalidate_facets_on_product_change(sender, instance, created, **kwargs):
+    previous_state = getattr(instance, '_previous_state', None)
+    state = (instance.category_id, instance.product_type_id)
+    if previous_state and not created:
+        if (previous_state[0], previous_state[2]) == state:
+            return
+    invalidate_facets_cache()
+
+
+def invalidate_facets_on_change(sender, **kwargs):
+    action = kwargs.get('action')
+    if action is None or action.startswith('post_'):
+        invalidate_facets_cache()
+
+
+def update_category_counts_on_product_delete(sender, instance, **kwargs):
+    update_categories_product_counts([instance.category_id])
+
+
+def update_category_counts_on_tree_change(sender, instance, **kwargs):
+    # Moves and deletions affect counts of whole branches, rebuild them all
+    transaction.on_commit(update_categories_product_counts_task.delay)
+
+
+def invalidate_category_tree_on_change(sender, **kwargs):
+    invalidate_category_tree()
+
+
+def update_pricing_on_category_change(sender, instance, **kwargs):
+    # Moving a category changes which category sales apply to its products
+    if Sale.categories.through.objects.exists():
+        schedule_pricing_update(get_category_product_ids([instance.pk]))
+
+
+def update_pricing_on_sale_change(sender, instance, **kwargs):
+    schedule_pricing_update(get_sale_product_ids(instance))
+
+
+def collect_sale_products(sender, instance, **kwargs):
+    instance._pricing_product_ids = get_sale_product_ids(instance)
+
+
+def update_pricing_on_sale_delete(sender, instance, **kwargs):
+    schedule_pricing_update(getattr(instance, '_pricing_product_ids', ()))
+
+
+def _get_sale_rule_product_ids(sender, instance, reverse, pk_set):
+    if sender is Sale.categories.through:
+        if reverse:
+            category_ids = [instance.pk]
+        elif pk_set is None:
+            category_ids = instance.categories.values_list('pk', flat=True)
+        else:
+            category_ids = pk_set
+        return get_category_product_ids(category_ids)
+    if reverse:
+        return {instance.pk}
+    if pk_set is None:
+        return set(instance.products.values_list('pk', flat=True))
+    return set(pk_set)
+
+
+def update_pricing_on_sale_rules_change(
+        sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        instance._pricing_product_ids = _get_sale_rule_product_ids(
+            sender, instance, reverse, None)
+    elif action == 'post_clear':
+        schedule_pricing_update(
+            getattr(instance, '_pricing_product_ids', ()))
+    elif action in {'post_add', 'post_remove'}:
+        schedule_pricing_update(_get_sale_rule_product_ids(
+            sender, instance, reverse, pk_set))
+
+
+def update_display_names_on_attribute_change(sender, instance, **kwargs):
+    # Connected after the attributes cache invalidation, so the attribute
+    # registry already reflects the change
+    variants = ProductVariant.objects.filter(
+        attributes__has_key=smart_text(instance.pk))
+    update_variants_display_names(variants)
+
+
+def update_display_names_on_value_change(sender, instance, **kwargs):
+    variants = ProductVariant.objects.filter(attributes__contains={
+        smart_text(instance.attribute_id): smart_text(instance.pk)})
+    update_variants_display_names(variants)
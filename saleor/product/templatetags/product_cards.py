@@ -0,0 +1,13 @@
+from django import template
+
+from ..cards import get_product_cards
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def product_cards(context, products, template_name):
+    """Return cached cards of products paired with their availability."""
+    request = context.get('request')
+    currency = getattr(request, 'currency', None)
+    return get_product_cards(products, template_name, currency)
@@ -3,18 +3,29 @@ from urllib.parse import urlencode
 
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
-from django.db.models import F
+from django.core.cache import cache
+from django.db.models import F, Prefetch
 from django.utils.encoding import smart_text
 from django_prices.templatetags import prices_i18n
 from prices import Price, PriceRange
 
 from . import ProductAvailabilityStatus, VariantAvailabilityStatus
 from ..cart.utils import get_cart_from_request, get_or_create_cart_from_request
-from ..core.utils import get_paginator_items, to_local_currency
-from ..core.utils.billing import get_tax_price, price_range_get_taxed
+from ..core.utils import get_paginator_items, to_local_currencies
+from ..core.utils.billing import price_ranges_get_taxed
+from ..core.utils.cache import bump_cache_version, get_cache_version
 from ..core.utils.filters import get_now_sorted_by
+from .attributes import ATTRIBUTES_VERSION_NAME, get_attribute_registry
 from .forms import ProductForm
 
+PRODUCT_VERSION_NAME = 'product:%s'
+LISTINGS_VERSION_NAME = 'product-listings'
+# The product row, its images, variants, their stock and images, and the
+# attributes of its type
+PRODUCT_DETAILS_QUERIES = 7
+VARIANT_PICKER_CACHE_KEY = 'variant-picker:%s:%s:%s:%s'
+VARIANT_PICKER_CACHE_TIMEOUT = 60 * 60 * 24
+
 
 def products_visible_to_user(user, staff_view_all=False):
     # pylint: disable=cyclic-import
@@ -30,12 +41,22 @@ def products_visible_to_user(user, staff_view_all=False):
 
 
 def products_with_details(user, staff_view_all=False):
+    """Return products with everything their pages show fetched.
+
+    Each product of the results costs `PRODUCT_DETAILS_QUERIES` queries.
+    """
+    # pylint: disable=cyclic-import
+    from .models import VariantImage
+
     products = products_visible_to_user(user, staff_view_all)
+    products = products.select_related('pricing', 'category', 'product_type')
     products = products.prefetch_related(
-        'category', 'images', 'variants__stock',
-        'variants__variant_images__image', 'attributes__values',
-        'product_type__variant_attributes__values',
-        'product_type__product_attributes__values')
+        'images', 'variants__stock',
+        Prefetch(
+            'variants__variant_images',
+            queryset=VariantImage.objects.select_related('image')),
+        'product_type__variant_attributes',
+        'product_type__product_attributes')
     return products
 
 
@@ -52,8 +73,20 @@ def get_product_images(product):
 
 
 def products_with_availability(products, discounts, local_currency):
+    """Yield products along with their availability.
+
+    Products having a denormalized pricing row are served from it, which
+    reflects the active sales and avoids walking variants and stock.
+    """
     for product in products:
-        yield product, get_availability(product, discounts, local_currency)
+        pricing = getattr(product, 'pricing', None)
+        if pricing is not None:
+            availability = get_availability_from_pricing(
+                product, pricing, local_currency)
+        else:
+            availability = get_availability(
+                product, discounts, local_currency)
+        yield product, availability
 
 
 ProductAvailability = namedtuple(
@@ -68,6 +101,39 @@ def get_availability(product, discounts=None, local_currency=None):
     # In default currency
     price_range = product.get_price_range(discounts=discounts)
     undiscounted = product.get_price_range()
+    return get_availability_from_price_ranges(
+        product, price_range, undiscounted, product.is_in_stock(),
+        local_currency)
+
+
+def get_availability_from_pricing(product, pricing, local_currency=None):
+    """Return product availability using its denormalized pricing row."""
+    return get_availability_from_price_ranges(
+        product, pricing.discounted_price_range, pricing.price_range,
+        pricing.is_in_stock, local_currency)
+
+
+def get_availability_from_variants_prices(
+        product, variants_prices, local_currency=None):
+    """Return product availability using prices computed for its variants.
+
+    `variants_prices` maps pks of all variants of the product, which must
+    have at least one, to their `VariantPrices`.
+    """
+    prices = [
+        variants_prices[variant.pk] for variant in product.variants.all()]
+    discounted = [variant_prices.price for variant_prices in prices]
+    undiscounted = [
+        variant_prices.price_undiscounted for variant_prices in prices]
+    return get_availability_from_price_ranges(
+        product, PriceRange(min(discounted), max(discounted)),
+        PriceRange(min(undiscounted), max(undiscounted)),
+        product.is_in_stock(), local_currency)
+
+
+def get_availability_from_price_ranges(
+        product, price_range, undiscounted, is_in_stock,
+        local_currency=None):
     if undiscounted.min_price > price_range.min_price:
         discount = undiscounted.min_price - price_range.min_price
     else:
@@ -75,10 +141,8 @@ def get_availability(product, discounts=None, local_currency=None):
 
     # Local currency
     if local_currency:
-        price_range_local = to_local_currency(
-            price_range, local_currency)
-        undiscounted_local = to_local_currency(
-            undiscounted, local_currency)
+        price_range_local, undiscounted_local = to_local_currencies(
+            (price_range, undiscounted), local_currency)
         if (undiscounted_local and
                 undiscounted_local.min_price > price_range_local.min_price):
             discount_local_currency = (
@@ -89,31 +153,35 @@ def get_availability(product, discounts=None, local_currency=None):
         price_range_local = None
         discount_local_currency = None
 
-    is_available = product.is_in_stock() and product.is_available()
+    is_available = is_in_stock and product.is_available()
     is_on_sale = (
         product.is_available() and discount is not None and
         undiscounted.min_price != price_range.min_price)
 
+    taxed_price_range, taxed_undiscounted = price_ranges_get_taxed(
+        (price_range, undiscounted))
+
     return ProductAvailability(
         available=is_available,
         on_sale=is_on_sale,
         price_range=price_range,
         price_range_undiscounted=undiscounted,
-        taxed_price_range=price_range_get_taxed(price_range),
-        taxed_price_range_undiscounted=price_range_get_taxed(undiscounted),
+        taxed_price_range=taxed_price_range,
+        taxed_price_range_undiscounted=taxed_undiscounted,
         discount=discount,
         price_range_local_currency=price_range_local,
         discount_local_currency=discount_local_currency)
 
 
-def handle_cart_form(request, product, create_cart=False):
+def handle_cart_form(
+        request, product, create_cart=False, variants_prices=None):
     if create_cart:
         cart = get_or_create_cart_from_request(request)
     else:
         cart = get_cart_from_request(request)
     form = ProductForm(
         cart=cart, product=product, data=request.POST or None,
-        discounts=request.discounts)
+        discounts=request.discounts, variants_prices=variants_prices)
     return form, cart
 
 
@@ -123,9 +191,13 @@ def products_for_cart(user):
     return products
 
 
-def product_json_ld(product, attributes=None):
+def product_json_ld(product, attributes=None, variants_prices=None):
     # type: (saleor.product.models.Product, saleor.product.utils.ProductAvailability, dict) -> dict  # noqa
-    """Generate JSON-LD data for product."""
+    """Generate JSON-LD data for product.
+
+    Undiscounted prices are taken from `variants_prices`, a map of variant
+    pks to `VariantPrices`, when given.
+    """
     data = {'@context': 'http://schema.org/',
             '@type': 'Product',
             'name': smart_text(product),
@@ -136,7 +208,10 @@ def product_json_ld(product, attributes=None):
             'offers': []}
 
     for variant in product.variants.all():
-        price = variant.get_price_per_item()
+        if variants_prices is not None and variant.pk in variants_prices:
+            price = variants_prices[variant.pk].price_undiscounted
+        else:
+            price = variant.get_price_per_item()
         available = 'http://schema.org/InStock'
         if not product.is_available() or not variant.is_in_stock():
             available = 'http://schema.org/OutOfStock'
@@ -163,51 +238,62 @@ def product_json_ld(product, attributes=None):
     return data
 
 
-def get_variant_picker_data(product, discounts=None, local_currency=None):
-    availability = get_availability(product, discounts, local_currency)
-    variants = product.variants.all()
-    data = {'variantAttributes': [], 'variants': []}
+def get_product_version_name(product_id):
+    return PRODUCT_VERSION_NAME % (product_id,)
 
-    variant_attributes = product.product_type.variant_attributes.all()
 
-    # Collect only available variants
-    filter_available_variants = defaultdict(list)
+def invalidate_products_cache(product_ids):
+    """Invalidate data cached for the given products, e.g. on stock change.
 
-    for variant in variants:
-        price = variant.get_price_per_item(discounts)
-        price_undiscounted = variant.get_price_per_item()
-        if local_currency:
-            price_local_currency = to_local_currency(price, local_currency)
-        else:
-            price_local_currency = None
+    Product listings are left intact, they only change along with the stock
+    status or pricing of products.
+    """
+    for product_id in set(product_ids):
+        bump_cache_version(get_product_version_name(product_id))
+
+
+def invalidate_listings_cache():
+    bump_cache_version(LISTINGS_VERSION_NAME)
+
+
+def invalidate_attributes_cache():
+    bump_cache_version(ATTRIBUTES_VERSION_NAME)
+
+
+def get_variant_picker_cache_key(product):
+    updated_at = product.updated_at.timestamp() if product.updated_at else ''
+    return VARIANT_PICKER_CACHE_KEY % (
+        product.pk, updated_at,
+        get_cache_version(get_product_version_name(product.pk)),
+        get_cache_version(ATTRIBUTES_VERSION_NAME))
 
-        schema_data = {'@type': 'Offer',
-                       'itemCondition': 'http://schema.org/NewCondition',
-                       'priceCurrency': price.currency,
-                       'price': price.net}
+
+def build_variant_picker_structure(product):
+    """Return the part of the variant picker data not depending on prices."""
+    data = {'variantAttributes': [], 'variants': []}
+    # Collect only available variants
+    filter_available_variants = defaultdict(set)
+    for variant in product.variants.all():
         in_stock = variant.is_in_stock()
         if in_stock:
-            schema_data['availability'] = 'http://schema.org/InStock'
+            schema_availability = 'http://schema.org/InStock'
         else:
-            schema_data['availability'] = 'http://schema.org/OutOfStock'
-
-        variant_data = {
+            schema_availability = 'http://schema.org/OutOfStock'
+        data['variants'].append({
             'id': variant.id,
             'availability': in_stock,
-            'price': price_as_dict(price),
-            'priceUndiscounted': price_as_dict(price_undiscounted),
-            'taxedPrice': price_as_dict(get_tax_price(total=price)[0]),
-            'taxedPriceUndiscounted': price_as_dict(get_tax_price(total=price_undiscounted)[0]),
             'attributes': variant.attributes,
-            'priceLocalCurrency': price_as_dict(price_local_currency),
-            'schemaData': schema_data}
-        data['variants'].append(variant_data)
+            'schemaData': {
+                '@type': 'Offer',
+                'itemCondition': 'http://schema.org/NewCondition',
+                'availability': schema_availability}})
 
         for variant_key, variant_value in variant.attributes.items():
-            filter_available_variants[int(variant_key)].append(
+            filter_available_variants[int(variant_key)].add(
                 int(variant_value))
 
-    for attribute in variant_attributes:
+    registry = get_attribute_registry()
+    for attribute in product.product_type.variant_attributes.all():
         available_variants = filter_available_variants.get(attribute.pk, None)
 
         if available_variants:
@@ -217,8 +303,85 @@ def get_variant_picker_data(product, discounts=None, local_currency=None):
                 'slug': attribute.slug,
                 'values': [
                     {'pk': value.pk, 'name': value.name, 'slug': value.slug}
-                    for value in attribute.values.filter(
-                        pk__in=available_variants)]})
+                    for value in registry.get_values(attribute.pk)
+                    if value.pk in available_variants]})
+    return data
+
+
+def get_variant_picker_structure(product):
+    """Return the cached part of the variant picker data of a product.
+
+    The cache key changes when the product is saved, when its variants or
+    stock change, and when attributes are edited.
+    """
+    key = get_variant_picker_cache_key(product)
+    data = cache.get(key)
+    if data is None:
+        data = build_variant_picker_structure(product)
+        cache.set(key, data, VARIANT_PICKER_CACHE_TIMEOUT)
+    return data
+
+
+def get_variants_prices_map(variants, discounts=None):
+    """Return `VariantPrices` of the given variants keyed by their pks."""
+    # pylint: disable=cyclic-import
+    from .price_engine import get_variants_prices
+
+    variants = list(variants)
+    return dict(zip(
+        [variant.pk for variant in variants],
+        get_variants_prices(variants, discounts=discounts)))
+
+
+def get_variant_picker_data(
+        product, discounts=None, local_currency=None, variants_prices=None,
+        availability=None):
+    """Return data of the variant picker of a product.
+
+    Prices of variants and the availability of the product are computed
+    unless given as `variants_prices`, a map of variant pks to
+    `VariantPrices`, and `availability`.
+    """
+    if availability is None:
+        availability = get_availability(product, discounts, local_currency)
+    structure = get_variant_picker_structure(product)
+    data = {
+        'variantAttributes': structure['variantAttributes'], 'variants': []}
+
+    variants = list(product.variants.all())
+    if variants_prices is None:
+        variants_prices = get_variants_prices_map(variants, discounts)
+    variants_prices = [variants_prices[variant.pk] for variant in variants]
+    if local_currency:
+        local_prices = to_local_currencies(
+            [variant_prices.price for variant_prices in variants_prices],
+            local_currency)
+    else:
+        local_prices = [None] * len(variants_prices)
+    prices_map = {
+        variant.pk: (variant_prices, price_local_currency)
+        for variant, variant_prices, price_local_currency in zip(
+            variants, variants_prices, local_prices)}
+
+    # Overlay prices valid for the current request on the cached structure
+    for variant_data in structure['variants']:
+        if variant_data['id'] not in prices_map:
+            continue
+        variant_prices, price_local_currency = prices_map[variant_data['id']]
+        price = variant_prices.price
+        schema_data = dict(
+            variant_data['schemaData'], priceCurrency=price.currency,
+            price=price.net)
+        data['variants'].append(dict(
+            variant_data,
+            price=price_as_dict(price),
+            priceUndiscounted=price_as_dict(
+                variant_prices.price_undiscounted),
+            taxedPrice=price_as_dict(variant_prices.taxed_price),
+            taxedPriceUndiscounted=price_as_dict(
+                variant_prices.taxed_price_undiscounted),
+            priceLocalCurrency=price_as_dict(price_local_currency),
+            schemaData=schema_data))
 
     data['availability'] = {
         'discount': price_as_dict(availability.discount),
@@ -263,22 +426,26 @@ def get_variant_url_from_product(product, attributes):
 
 def get_variant_url(variant):
     attributes = {}
-    values = {}
     for attribute in variant.product.product_type.variant_attributes.all():
         attributes[str(attribute.pk)] = attribute
-        for value in attribute.values.all():
-            values[str(value.pk)] = value
 
     return get_variant_url_from_product(variant.product, attributes)
 
 
-def get_attributes_display_map(obj, attributes):
+def get_attributes_display_map(obj, attributes=None):
+    """Map attribute pks of the object to attribute values.
+
+    Values are looked up in the attribute registry. When `attributes` is
+    not given, all attributes set on the object are mapped.
+    """
+    registry = get_attribute_registry()
+    if attributes is None:
+        return registry.decode(obj.attributes)
     display_map = {}
     for attribute in attributes:
         value = obj.attributes.get(smart_text(attribute.pk))
         if value:
-            choices = {smart_text(a.pk): a for a in attribute.values.all()}
-            choice_obj = choices.get(value)
+            choice_obj = registry.get_value(value, attribute.pk)
             if choice_obj:
                 display_map[attribute.pk] = choice_obj
             else:
@@ -286,20 +453,53 @@ def get_attributes_display_map(obj, attributes):
     return display_map
 
 
+def update_variants_display_names(variants):
+    """Recompute and store display names of the given variants.
+
+    Variants sharing the same new name are updated with a single query.
+    """
+    # pylint: disable=cyclic-import
+    from .models import ProductVariant
+
+    changed = defaultdict(list)
+    for variant in variants:
+        display_name = variant.generate_display_name()
+        if display_name != variant.display_name:
+            changed[display_name].append(variant.pk)
+    for display_name, pks in changed.items():
+        ProductVariant.objects.filter(pk__in=pks).update(
+            display_name=display_name)
+    return sum(len(pks) for pks in changed.values())
+
+
+def update_products_slugs(products):
+    """Recompute and store slugs of the given products."""
+    # pylint: disable=cyclic-import
+    from .models import Product
+
+    changed = 0
+    for product in products:
+        slug = product.generate_slug()
+        if slug != product.slug:
+            Product.objects.filter(pk=product.pk).update(slug=slug)
+            changed += 1
+    return changed
+
+
 def get_product_availability_status(product):
     from .models import Stock
 
     is_available = product.is_available()
     has_stock_records = Stock.objects.filter(variant__product=product)
+    variants = list(product.variants.all())
     are_all_variants_in_stock = all(
-        variant.is_in_stock() for variant in product.variants.all())
-    is_in_stock = any(
-        variant.is_in_stock() for variant in product.variants.all())
+        variant.is_in_stock() for variant in variants)
+    is_in_stock = any(variant.is_in_stock() for variant in variants)
     requires_variants = product.product_type.has_variants
 
     if not product.is_published:
         return ProductAvailabilityStatus.NOT_PUBLISHED
-    if requires_variants and not product.variants.exists():
+    if requires_variants and not variants:
         # We check the requires_variants flag here in order to not show this
         # status with product types that don't require variants, as in that
         # case variants are hidden from the UI and user doesn't manage them.
@@ -409,6 +609,44 @@ def decrease_stock(stock, quantity):
     stock.save(update_fields=['quantity', 'quantity_allocated'])
 
 
+def allocate_stocks(quantities):
+    """Allocate quantities of many stock rows, keyed by stock pks.
+
+    Every row is changed with a single UPDATE, in the order of pks. No
+    signals are sent, so the products of the rows are refreshed at once.
+    """
+    # pylint: disable=cyclic-import
+    from .models import Stock
+
+    for stock_pk, quantity in sorted(quantities.items()):
+        Stock.objects.filter(pk=stock_pk).update(
+            quantity_allocated=F('quantity_allocated') + quantity)
+    refresh_stock_products(list(quantities))
+
+
+def refresh_stock_products(stock_pks):
+    """Refresh the stock of variants and products of stock rows.
+
+    Stored quantities of variants, the low stock tables, the stock status of
+    products and their caches are refreshed. Needed after stock rows are
+    changed without sending signals.
+    """
+    # pylint: disable=cyclic-import
+    from .low_stock import update_variants_low_stock
+    from .models import Stock
+    from .pricing import (
+        update_products_stock_status, update_variants_quantity_available)
+
+    rows = list(Stock.objects.filter(pk__in=stock_pks).values_list(
+        'variant_id', 'variant__product_id'))
+    variant_ids = [variant_id for variant_id, dummy in rows]
+    update_variants_quantity_available(variant_ids)
+    update_variants_low_stock(variant_ids)
+    product_ids = set(product_id for dummy, product_id in rows)
+    update_products_stock_status(product_ids)
+    invalidate_products_cache(product_ids)
+
+
 def get_product_list_context(request, filter_set):
     """
     :param request: request object
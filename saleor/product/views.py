@@ -1,4 +1,3 @@
-import datetime
 import json
 
 from django.http import HttpResponsePermanentRedirect, JsonResponse
@@ -8,14 +7,22 @@ from django.urls import reverse
 
 from ..cart.utils import set_cart_cookie
 from ..core.utils import serialize_decimal
+from ..core.utils.conditional import conditional_page
+from ..core.utils.page_cache import cache_anonymous_page
+from .categories import get_category_products_lookup, get_category_tree
+from .details import get_product_details, get_product_with_details
 from .filters import ProductCategoryFilter, ProductCollectionFilter
 from .models import Category, Collection
+from .page_cache import (
+    CATALOG_VERSION_NAMES, LISTING_VERSION_NAMES,
+    get_product_page_version_name)
 from .utils import (
-    get_availability, get_product_attributes_data, get_product_images,
-    get_variant_picker_data, handle_cart_form, product_json_ld,
-    products_for_cart, get_product_list_context, products_with_details)
+    handle_cart_form, products_for_cart, get_product_list_context,
+    products_with_details)
 
 
+@conditional_page(*CATALOG_VERSION_NAMES, get_product_page_version_name)
+@cache_anonymous_page(*CATALOG_VERSION_NAMES, get_product_page_version_name)
 def product_details(request, slug, product_id, form=None):
     """Product details page.
 
@@ -46,37 +53,28 @@ def product_details(request, slug, product_id, form=None):
         currency. The value will be None if exchange rate is not available or
         the local currency is the same as site's default currency.
     """
-    products = products_with_details(user=request.user, staff_view_all=True)
-    product = get_object_or_404(products, id=product_id)
+    product = get_product_with_details(request.user, product_id)
     if product.get_slug() != slug:
         return HttpResponsePermanentRedirect(product.get_absolute_url())
-    today = datetime.date.today()
-    is_visible = (
-        product.available_on is None or product.available_on <= today)
+    details = get_product_details(
+        product, discounts=request.discounts, local_currency=request.currency)
     if form is None:
-        form = handle_cart_form(request, product, create_cart=False)[0]
-    availability = get_availability(product, discounts=request.discounts,
-                                    local_currency=request.currency)
-    product_images = get_product_images(product)
-    variant_picker_data = get_variant_picker_data(
-        product, request.discounts, request.currency)
-    product_attributes = get_product_attributes_data(product)
-    # show_variant_picker determines if variant picker is used or select input
-    show_variant_picker = all([v.attributes for v in product.variants.all()])
-    json_ld_data = product_json_ld(product, product_attributes)
+        form = handle_cart_form(
+            request, product, create_cart=False,
+            variants_prices=details.variants_prices)[0]
     return TemplateResponse(
         request, 'product/details.html',
-        {'is_visible': is_visible,
+        {'is_visible': details.is_visible,
          'form': form,
-         'availability': availability,
+         'availability': details.availability,
          'product': product,
-         'product_attributes': product_attributes,
-         'product_images': product_images,
-         'show_variant_picker': show_variant_picker,
+         'product_attributes': details.attributes,
+         'product_images': details.images,
+         'show_variant_picker': details.show_variant_picker,
          'variant_picker_data': json.dumps(
-             variant_picker_data, default=serialize_decimal),
+             details.variant_picker_data, default=serialize_decimal),
          'json_ld_product_data': json.dumps(
-             json_ld_data, default=serialize_decimal)})
+             details.json_ld_data, default=serialize_decimal)})
 
 
 def product_add_to_cart(request, slug, product_id):
@@ -107,24 +105,34 @@ def product_add_to_cart(request, slug, product_id):
     return response
 
 
+@conditional_page(*LISTING_VERSION_NAMES)
+@cache_anonymous_page(*LISTING_VERSION_NAMES)
 def category_index(request, path, category_id):
-    category = get_object_or_404(Category, id=category_id)
+    tree = get_category_tree()
+    category = tree.get(int(category_id))
+    if category is None:
+        # Not in the snapshot yet, render it from the database instead
+        category = get_object_or_404(Category, id=category_id)
+        ancestors = category.get_ancestors()
+        children = category.get_children()
+    else:
+        ancestors = tree.get_ancestors(category.pk)
+        children = tree.get_children(category.pk)
     actual_path = category.get_full_path()
     if actual_path != path:
         return redirect('product:category', permanent=True, path=actual_path,
                         category_id=category_id)
-    ctx = {}
-
-    if category.is_leaf_node():
-        products = products_with_details(user=request.user).filter(
-            category__id=category.id).order_by('name')
-        product_filter = ProductCategoryFilter(
-            request.GET, queryset=products, category=category)
-        ctx = get_product_list_context(request, product_filter)
-    ctx.update({'object': category})
+    products = products_with_details(user=request.user).filter(
+        get_category_products_lookup([category])).order_by('name')
+    product_filter = ProductCategoryFilter(
+        request.GET, queryset=products, category=category)
+    ctx = get_product_list_context(request, product_filter)
+    ctx.update(
+        {'object': category, 'ancestors': ancestors, 'children': children})
     return TemplateResponse(request, 'category/index.html', ctx)
 
 
+@cache_anonymous_page(*LISTING_VERSION_NAMES)
 def collection_index(request, slug, pk):
     collection = get_object_or_404(Collection, id=pk)
     products = products_with_details(user=request.user).filter(
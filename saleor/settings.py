@@ -214,11 +214,11 @@ INSTALLED_APPS = [
 
     # Local apps
     'saleor.userprofile',
-    'saleor.discount',
-    'saleor.product',
+    'saleor.discount.DiscountAppConfig',
+    'saleor.product.ProductAppConfig',
     'saleor.cart',
     'saleor.checkout',
-    'saleor.core',
+    'saleor.core.CoreAppConfig',
     'saleor.graphql',
     'saleor.order.OrderAppConfig',
     'saleor.dashboard',
@@ -226,7 +226,7 @@ INSTALLED_APPS = [
     'saleor.search',
     'saleor.site',
     'saleor.data_feeds',
-    'saleor.page',
+    'saleor.page.PageAppConfig',
 
     # External apps
     'versatileimagefield',
@@ -356,6 +356,10 @@ PAGINATE_BY = 16
 DASHBOARD_PAGINATE_BY = 30
 DASHBOARD_SEARCH_LIMIT = 5
 
+# Cache storefront pages rendered for anonymous visitors
+ENABLE_PAGE_CACHE = get_bool('ENABLE_PAGE_CACHE', False)
+PAGE_CACHE_TIMEOUT = int(os.environ.get('PAGE_CACHE_TIMEOUT', 60 * 15))
+
 bootstrap4 = {
     'set_placeholder': False,
     'set_required': False,
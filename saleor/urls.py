@@ -8,8 +8,9 @@ from graphene_django.views import GraphQLView
 
 from .cart.urls import urlpatterns as cart_urls
 from .checkout.urls import urlpatterns as checkout_urls
-from .core.sitemaps import sitemaps
+from .core.sitemaps import SITEMAP_VERSION_NAMES, sitemaps
 from .core.urls import urlpatterns as core_urls
+from .core.utils.conditional import conditional_page
 from .dashboard.urls import urlpatterns as dashboard_urls
 from .data_feeds.urls import urlpatterns as feed_urls
 from .order.urls import urlpatterns as order_urls
@@ -40,8 +41,9 @@ urlpatterns = [
     url(r'^feeds/',
         include((feed_urls, 'data_feeds'), namespace='data_feeds')),
     url(r'^search/', include((search_urls, 'search'), namespace='search')),
-    url(r'^sitemap\.xml$', sitemap, {'sitemaps': sitemaps},
-        name='django.contrib.sitemaps.views.sitemap'),
+    url(r'^sitemap\.xml$',
+        conditional_page(*SITEMAP_VERSION_NAMES, per_visitor=False)(sitemap),
+        {'sitemaps': sitemaps}, name='django.contrib.sitemaps.views.sitemap'),
     url(r'', include('payments.urls')),
     url('', include('social_django.urls', namespace='social'))]
 
@@ -5,6 +5,7 @@ from unittest.mock import MagicMock
 import pytest
 from django.contrib.auth.models import AnonymousUser, Group, Permission
 from django.contrib.sites.models import Site
+from django.core.cache import cache
 from django.core.files import File
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.utils.encoding import smart_text
@@ -44,6 +45,16 @@ def site_settings(db, settings):
     return obj
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Reset the shared cache so that snapshot versions don't leak between
+    tests whose database changes were rolled back.
+    """
+    cache.clear()
+    yield
+    cache.clear()
+
+
 @pytest.fixture
 def cart(db):  # pylint: disable=W0613
     return Cart.objects.create()
@@ -23,6 +23,7 @@ from saleor.cart.views import (
     _get_variant_quantity_value, _parse_variant_quantity, update)
 from saleor.discount.models import Sale
 from saleor.product.models import ProductVariant, Stock, StockLocation
+from saleor.product.utils import refresh_stock_products
 from saleor.shipping.utils import get_shipment_options
 
 
@@ -314,6 +315,26 @@ def test_replacing_same_variant(cart, product_in_stock):
     assert cart.count() == {'total_quantity': 2}
 
 
+def test_updating_many_lines(cart, product_in_stock, variant_list):
+    variant = product_in_stock.variants.get()
+    other_variant, removed_variant = variant_list[:2]
+    cart.add(variant, 1)
+    cart.add(removed_variant, 2, check_quantity=False)
+
+    with pytest.raises(InsufficientStock):
+        cart.update_lines([(variant, 2, False), (other_variant, 1, True)])
+    assert cart.count() == {'total_quantity': 3}
+
+    cart.update_lines([
+        (variant, 2, False), (other_variant, 1, True),
+        (other_variant, 3, False), (removed_variant, 0, True)],
+        check_quantity=False)
+    assert cart.quantity == 7
+    assert {
+        line.variant: line.quantity for line in cart.lines.all()} == {
+            variant: 3, other_variant: 4}
+
+
 def test_adding_invalid_quantity(cart, product_in_stock):
     variant = product_in_stock.variants.get()
     with pytest.raises(ValueError):
@@ -387,6 +408,7 @@ def test_remove_unavailable_variants(cart, product_in_stock):
     variant = product_in_stock.variants.get()
     cart.add(variant, 1)
     variant.stock.update(quantity=0)
+    refresh_stock_products(variant.stock.values_list('pk', flat=True))
     utils.remove_unavailable_variants(cart)
     assert len(cart) == 0
 
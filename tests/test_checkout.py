@@ -7,7 +7,9 @@ from unittest.mock import MagicMock, Mock
 
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
+from django.db import connection
 from django.test import Client
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from prices import Price
 from satchless.item import InsufficientStock
@@ -384,6 +386,26 @@ def test_checkout_create_order_with_delivery_dates(
     TestCase.run()
 
 
+def test_checkout_create_order_inserts_lines_at_once(
+        checkout: Checkout, variant_list):
+    warehouse = StockLocation.objects.create(name='Warehouse')
+    for variant in variant_list:
+        Stock.objects.create(
+            variant=variant, cost_price=1, quantity=10, location=warehouse)
+        checkout.cart.add(variant, quantity=2)
+
+    with CaptureQueriesContext(connection) as queries:
+        order = checkout.create_order()
+
+    tables = [
+        query['sql'].split('"')[1] for query in queries.captured_queries
+        if query['sql'].startswith('INSERT INTO "order_')]
+    assert sorted(tables) == [
+        'order_deliverygroup', 'order_order', 'order_orderline']
+    assert order.get_lines().count() == len(variant_list)
+    assert all(line.quantity == 2 for line in order.get_lines())
+
+
 @pytest.mark.parametrize('note_value', [
     '',
     '    ',
@@ -1,15 +1,19 @@
 from unittest.mock import Mock
 
 import pytest
-from decimal import Decimal
+from decimal import ROUND_HALF_UP, Decimal
 from django.shortcuts import reverse
 from django.test import RequestFactory, Client
-from prices import Price
+from django_prices_openexchangerates.models import ConversionRate
+from prices import Price, PriceRange
 
 from saleor.core.utils import (
     Country, create_superuser, get_country_by_ip, get_currency_for_country,
     random_data)
-from saleor.core.utils.billing import get_tax_country_code, get_tax_price
+from saleor.core.utils.billing import (
+    get_tax_country_code, get_tax_price, get_taxed_prices,
+    price_ranges_get_taxed)
+from saleor.core.utils.exchange_rates import exchange_prices
 from saleor.core.utils.warmer import CategoryWarmer, ProductWarmer, PRODUCT_IMAGE_SETS, CATEGORY_IMAGE_SETS
 from saleor.discount.models import Sale, Voucher
 from saleor.order.models import Order
@@ -173,6 +177,20 @@ def test_get_tax_country_code():
     assert rate == 0.20
 
 
+def test_taxed_prices_are_quantized():
+    prices = [Price(Decimal('0.05')), Price(Decimal('10.99'))]
+    taxed = get_taxed_prices(prices, 'AT')
+    assert [price.gross for price in taxed] == [
+        Decimal('0.06'), Decimal('13.19')]
+    assert [price.net for price in taxed] == [
+        Decimal('0.05'), Decimal('10.99')]
+
+    price_range = PriceRange(*prices)
+    taxed_range, empty = price_ranges_get_taxed([price_range, None], 'AT')
+    assert taxed_range == PriceRange(*taxed)
+    assert empty is None
+
+
 def test_get_tax_price(order_with_lines: Order, billing_address):
     order = order_with_lines
     order.billing_address = billing_address
@@ -192,11 +210,15 @@ def test_get_tax_price(order_with_lines: Order, billing_address):
     poland_tax_rate = 0.23
     default_tax_rate = 0.20
 
-    croatia_taxed_price = order_total.gross * Decimal(1 + croatia_tax_rate)
-    poland_taxed_price = order_total.gross * Decimal(1 + poland_tax_rate)
+    def get_taxed(amount, rate):
+        taxed = amount * (1 + Decimal(str(rate)))
+        return taxed.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
 
-    croatia_taxed_price_10usd = Decimal(10.0) * Decimal(1 + croatia_tax_rate)
-    default_taxed_price_10usd = Decimal(10.0) * Decimal(1 + default_tax_rate)
+    croatia_taxed_price = get_taxed(order_total.gross, croatia_tax_rate)
+    poland_taxed_price = get_taxed(order_total.gross, poland_tax_rate)
+
+    croatia_taxed_price_10usd = get_taxed(Decimal(10), croatia_tax_rate)
+    default_taxed_price_10usd = get_taxed(Decimal(10), default_tax_rate)
 
     requests = (
         (request_factory.post('/test_HR', {'country': 'HR'}),
@@ -294,3 +316,20 @@ def test_home_view_featured_products(client: Client, product_in_stock: Product):
     product_in_stock.save()
 
     assert expected_html in _get()
+
+
+def test_exchange_prices_follows_rate_updates(db):
+    rate = ConversionRate.objects.create(to_currency='PLN', rate=Decimal(4))
+    price = Price(Decimal(10), currency='USD')
+    price_range = PriceRange(price, Price(Decimal(20), currency='USD'))
+    local_price, local_range, empty = exchange_prices(
+        [price, price_range, None], 'PLN')
+    assert local_price == Price(Decimal(40), currency='PLN')
+    assert local_range.max_price == Price(Decimal(80), currency='PLN')
+    assert empty is None
+    assert exchange_prices([price], 'EUR') == [None]
+
+    rate.rate = Decimal(5)
+    rate.save()
+    assert exchange_prices([price], 'PLN') == [
+        Price(Decimal(50), currency='PLN')]
@@ -11,8 +11,8 @@ from saleor.discount import (
 from saleor.discount.forms import CheckoutDiscountForm
 from saleor.discount.models import NotApplicable, Sale, Voucher
 from saleor.discount.utils import (
-    decrease_voucher_usage, increase_voucher_usage)
-from saleor.product.models import Product, ProductVariant
+    SaleIndex, decrease_voucher_usage, get_sale_index, increase_voucher_usage)
+from saleor.product.models import Category, Product, ProductVariant
 
 
 @pytest.mark.parametrize('limit, value', [
@@ -309,6 +309,65 @@ def test_sale_applies_to_correct_products(product_type, default_category):
         sale.modifier_for_product(sec_variant.product)
 
 
+def test_sale_index_applies_to_correct_products(
+        product_type, default_category):
+    product = Product.objects.create(
+        name='Test Product', price=10, description='',
+        product_type=product_type, category=default_category)
+    product2 = Product.objects.create(
+        name='Second product', price=15, description='',
+        product_type=product_type, category=default_category)
+    sale = Sale.objects.create(
+        name='Test sale', value=5, type=DiscountValueType.FIXED)
+    sale.products.add(product)
+    index = SaleIndex(Sale.objects.all())
+    assert index.get_sales_for_product(product) == [sale]
+    assert index.get_sales_for_product(product2) == []
+    modifiers = list(index.get_modifiers_for_product(product))
+    assert [modifier.amount for modifier in modifiers] == [
+        Price(net=5, currency='USD')]
+
+
+def test_sale_index_applies_to_category_descendants(
+        product_type, default_category):
+    child = Category.objects.create(
+        name='Child', slug='child', parent=default_category)
+    other = Category.objects.create(name='Other', slug='other')
+    product = Product.objects.create(
+        name='Test Product', price=10, description='',
+        product_type=product_type, category=child)
+    other_product = Product.objects.create(
+        name='Second product', price=15, description='',
+        product_type=product_type, category=other)
+    sale = Sale.objects.create(
+        name='Test sale', value=5, type=DiscountValueType.FIXED)
+    sale.categories.add(default_category)
+    index = SaleIndex(Sale.objects.all())
+    assert index.get_sales_for_product(product) == [sale]
+    assert index.get_sales_for_product(other_product) == []
+
+
+def test_sale_index_matches_modifier_for_product(product_in_stock, sale):
+    variant = product_in_stock.variants.get()
+    index = SaleIndex(Sale.objects.all())
+    assert list(index) == [sale]
+    assert variant.get_price_per_item(discounts=index) == (
+        variant.get_price_per_item(discounts=Sale.objects.all()))
+
+
+def test_sale_index_snapshot_is_invalidated(product_in_stock):
+    assert list(get_sale_index()) == []
+    assert get_sale_index() is get_sale_index()
+    sale = Sale.objects.create(name='Test sale', value=5)
+    assert list(get_sale_index()) == [sale]
+    assert get_sale_index().get_sales_for_product(product_in_stock) == []
+    sale.products.add(product_in_stock)
+    index = get_sale_index()
+    assert index.get_sales_for_product(product_in_stock) == [sale]
+    sale.delete()
+    assert list(get_sale_index()) == []
+
+
 def test_increase_voucher_usage():
     voucher = Voucher.objects.create(
         code='unique', type=VoucherType.VALUE,
@@ -1,6 +1,8 @@
 import json
 
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from saleor.product.models import Category, ProductAttribute
 
@@ -52,6 +54,38 @@ def test_category_query(client, product_in_stock):
         category_data['siblings'], category.get_siblings(), ['name'])
 
 
+def get_children_query_count(client, category):
+    query = """
+        query {
+            category(pk: %(category_pk)s) {
+                children {
+                    name
+                    productsCount
+                    siblings { name }
+                    children { name }
+                }
+            }
+        }
+    """ % {'category_pk': category.pk}
+    with CaptureQueriesContext(connection) as queries:
+        response = client.post('/graphql/', {'query': query})
+    assert_success(get_content(response))
+    return len(queries)
+
+
+@pytest.mark.django_db()
+def test_category_children_are_batched(client, default_category):
+    Category.objects.create(
+        name='First', slug='first', parent=default_category)
+    num_queries = get_children_query_count(client, default_category)
+    for i in range(3):
+        child = Category.objects.create(
+            name='Child %s' % i, slug='child-%s' % i, parent=default_category)
+        Category.objects.create(
+            name='Grandchild %s' % i, slug='grandchild-%s' % i, parent=child)
+    assert get_children_query_count(client, default_category) == num_queries
+
+
 @pytest.mark.django_db()
 def test_product_query(client, product_in_stock):
     category = Category.objects.first()
@@ -127,6 +161,33 @@ def test_filter_product_by_attributes(client, product_in_stock):
     assert product_data['name'] == product_in_stock.name
 
 
+@pytest.mark.django_db()
+@pytest.mark.parametrize('price_filter, count', [
+    ('priceLte: 10', 1), ('priceLte: 9.99', 0),
+    ('priceGte: 10', 1), ('priceGte: 10.01', 0)])
+def test_filter_product_by_price(
+        client, product_in_stock, price_filter, count):
+    category = Category.objects.first()
+    query = """
+        query {
+            category(pk: %(category_pk)s) {
+                products(%(price_filter)s, orderBy: "-price") {
+                    edges {
+                        node {
+                            name
+                        }
+                    }
+                }
+            }
+        }
+    """ % {'category_pk': category.pk, 'price_filter': price_filter}
+    response = client.post('/graphql/', {'query': query})
+    content = get_content(response)
+    assert_success(content)
+    edges = content['data']['category']['products']['edges']
+    assert len(edges) == count
+
+
 @pytest.mark.django_db()
 def test_attributes_query(client, product_in_stock):
     attributes = ProductAttribute.objects.prefetch_related('values')
@@ -171,3 +232,73 @@ def test_attributes_in_category_query(client, product_in_stock):
     response = client.post('/graphql/', {'query': query})
     content = get_content(response)
     assert_success(content)
+
+
+@pytest.mark.django_db()
+def test_paginate_collection_products(client, product_in_stock, collection):
+    names = ['Product %s' % i for i in range(5)]
+    for name in names:
+        product_in_stock.pk = None
+        product_in_stock.name = name
+        product_in_stock.save()
+        collection.products.add(product_in_stock)
+    query = """
+        query {
+            collection(pk: %(collection_pk)s) {
+                products(first: 2, after: %(after)s, orderBy: "-name") {
+                    edges { node { name } }
+                    pageInfo { hasNextPage endCursor }
+                }
+            }
+        }
+    """
+    after = 'null'
+    fetched = []
+    for _ in range(3):
+        response = client.post('/graphql/', {'query': query % {
+            'collection_pk': collection.pk, 'after': after}})
+        content = get_content(response)
+        assert_success(content)
+        products_data = content['data']['collection']['products']
+        fetched.extend(
+            edge['node']['name'] for edge in products_data['edges'])
+        after = json.dumps(products_data['pageInfo']['endCursor'])
+    assert fetched == sorted(names, reverse=True)
+    assert not products_data['pageInfo']['hasNextPage']
+
+
+@pytest.mark.django_db()
+@pytest.mark.parametrize('order_by', ['price', '-price'])
+def test_paginate_collection_products_by_price(
+        client, product_in_stock, collection, order_by):
+    prices = [30, 10, 20, 10, 5]
+    for i, price in enumerate(prices):
+        product_in_stock.pk = None
+        product_in_stock.name = 'Product %s' % i
+        product_in_stock.price = price
+        product_in_stock.save()
+        collection.products.add(product_in_stock)
+    query = """
+        query {
+            collection(pk: %(collection_pk)s) {
+                products(first: 2, after: %(after)s, orderBy: "%(order_by)s") {
+                    edges { node { price { gross } } }
+                    pageInfo { hasNextPage endCursor }
+                }
+            }
+        }
+    """
+    after = 'null'
+    fetched = []
+    for _ in range(3):
+        response = client.post('/graphql/', {'query': query % {
+            'collection_pk': collection.pk, 'after': after,
+            'order_by': order_by}})
+        content = get_content(response)
+        assert_success(content)
+        products_data = content['data']['collection']['products']
+        fetched.extend(
+            edge['node']['price']['gross'] for edge in products_data['edges'])
+        after = json.dumps(products_data['pageInfo']['endCursor'])
+    assert fetched == sorted(prices, reverse=order_by.startswith('-'))
+    assert not products_data['pageInfo']['hasNextPage']
@@ -1,9 +1,13 @@
 from decimal import Decimal
+
+import pytest
 from django.urls import reverse
 from django_countries.fields import Country
 from prices import Price
+from satchless.item import InsufficientStock
 
 from saleor.order import models, OrderStatus
+from saleor.order.allocation import allocate_variants
 from saleor.order.forms import OrderNoteForm
 from saleor.order.utils import add_variant_to_delivery_group
 from saleor.userprofile.models import Address, User
@@ -105,6 +109,31 @@ def test_add_variant_to_delivery_group_allocates_stock_for_existing_variant(
     assert stock.quantity_allocated == stock_before + 1
 
 
+def test_allocate_variants_splits_quantity_between_stock(
+        order_with_lines, product_in_stock):
+    group = order_with_lines.groups.get()
+    variant = product_in_stock.variants.get()
+    expensive_stock = variant.stock.get(location__name='Warehouse 2')
+    expensive_stock.quantity_allocated = 2
+    expensive_stock.save()
+    lines_before = group.lines.count()
+
+    with pytest.raises(InsufficientStock):
+        allocate_variants(group, [(variant, 9)])
+    assert group.lines.count() == lines_before
+
+    lines = allocate_variants(group, [(variant, 7)])
+
+    assert [
+        (line.stock_location, line.quantity) for line in lines] == [
+            ('Warehouse 3', 5), ('Warehouse 2', 2)]
+    assert group.lines.count() == lines_before + 2
+    allocated = dict(variant.stock.values_list(
+        'location__name', 'quantity_allocated'))
+    assert allocated == {
+        'Warehouse 1': 5, 'Warehouse 2': 4, 'Warehouse 3': 5}
+
+
 def test_order_status_open(open_orders):
     assert all([order.status == OrderStatus.OPEN for order in open_orders])
 
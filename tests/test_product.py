@@ -1,8 +1,10 @@
 import datetime
 import json
+import threading
 from unittest.mock import Mock
 
 import pytest
+from django.db import connection, transaction
 from django.template.response import TemplateResponse
 from django.urls import reverse
 from django.utils.encoding import smart_text
@@ -12,13 +14,36 @@ from tests.utils import filter_products_by_attribute, requires_login
 
 from saleor.cart import CartStatus, utils
 from saleor.cart.models import Cart
+from saleor.core.utils.billing import get_tax_price
+from saleor.core.utils.cache import get_cache_version
+from saleor.core.utils.page_cache import (
+    CART_COUNTER_PLACEHOLDER, CSRF_TOKEN_PLACEHOLDER)
+from saleor.discount import DiscountValueType
+from saleor.discount.models import Sale
+from saleor.discount.utils import get_sale_index
 from saleor.product import (
     ProductAvailabilityStatus, VariantAvailabilityStatus, models)
+from saleor.product.attributes import get_attribute_registry
+from saleor.product.cards import get_product_cards
+from saleor.product.categories import get_category_tree
+from saleor.product.counts import (
+    get_categories_product_counts, update_categories_product_counts)
+from saleor.product.details import (
+    PRODUCT_DETAILS_QUERY_BUDGET, get_product_details,
+    get_product_with_details)
+from saleor.product.facets import (
+    PRODUCT_FACET, VARIANT_FACET, get_attributes_lookup, get_facet_counts,
+    get_facet_definitions)
+from saleor.product.low_stock import (
+    get_low_stock_products, update_variants_low_stock)
+from saleor.product.price_engine import get_variants_prices
+from saleor.product.pricing import update_products_pricing
 from saleor.product.utils import (
-    allocate_stock, deallocate_stock, decrease_stock,
-    get_attributes_display_map, get_availability,
-    get_product_availability_status, get_variant_availability_status,
-    get_variant_picker_data, increase_stock)
+    LISTINGS_VERSION_NAME, allocate_stock, allocate_stocks, deallocate_stock,
+    decrease_stock, get_attributes_display_map, get_availability,
+    get_availability_from_pricing, get_product_availability_status,
+    get_variant_availability_status, get_variant_picker_data,
+    get_variant_picker_structure, increase_stock)
 
 
 @pytest.fixture()
@@ -77,6 +102,115 @@ def test_deallocate_stock(product_in_stock):
     assert stock.quantity_allocated == 30
 
 
+def test_stock_helpers_update_quantity_available(product_in_stock):
+    variant = product_in_stock.variants.get()
+    stock = variant.select_stockrecord(5)
+    assert variant.quantity_available == 5
+
+    allocate_stock(stock, 5)
+    assert variant.quantity_available == 0
+    assert not variant.is_in_stock()
+    product_in_stock.pricing.refresh_from_db()
+    assert not product_in_stock.pricing.is_in_stock
+    assert not models.Product.objects.in_stock().exists()
+
+    increase_stock(stock, 2)
+    variant.refresh_from_db()
+    assert variant.get_stock_quantity() == 2
+    product_in_stock.pricing.refresh_from_db()
+    assert product_in_stock.pricing.is_in_stock
+
+
+def test_stock_changes_invalidate_listings_on_stock_status_change(
+        product_in_stock):
+    stock = product_in_stock.variants.get().select_stockrecord(5)
+    version = get_cache_version(LISTINGS_VERSION_NAME)
+
+    allocate_stock(stock, 1)
+    assert get_cache_version(LISTINGS_VERSION_NAME) == version
+
+    allocate_stock(stock, 4)
+    assert get_cache_version(LISTINGS_VERSION_NAME) != version
+
+
+def test_variant_save_keeps_quantity_available(product_in_stock):
+    variant = product_in_stock.variants.get()
+    stale_variant = models.ProductVariant.objects.get(pk=variant.pk)
+    allocate_stock(variant.select_stockrecord(5), 5)
+    stale_variant.name = 'Renamed'
+    stale_variant.save()
+    variant.refresh_from_db()
+    assert variant.name == 'Renamed'
+    assert variant.quantity_available == 0
+
+
+def test_low_stock_is_tracked_on_stock_change(product_in_stock, settings):
+    settings.LOW_STOCK_THRESHOLD = 10
+    variant = product_in_stock.variants.get()
+    stock = variant.select_stockrecord(5)
+    assert list(get_low_stock_products()) == [product_in_stock]
+    assert get_low_stock_products().get().total_stock == 5
+    assert models.LowStockVariant.objects.get().variant == variant
+
+    increase_stock(stock, 20)
+    assert not get_low_stock_products().exists()
+    assert not models.LowStockVariant.objects.exists()
+
+    allocate_stock(stock, 20)
+    models.LowStockProduct.objects.all().delete()
+    update_variants_low_stock()
+    assert get_low_stock_products().get().total_stock == 5
+
+
+@pytest.mark.django_db(transaction=True)
+def test_low_stock_follows_stock_and_product_delete(product_in_stock):
+    variant = product_in_stock.variants.get()
+    variant.select_stockrecord(5).delete()
+    assert get_low_stock_products().get().total_stock == 0
+    assert models.LowStockVariant.objects.get().quantity_available == 0
+
+    product_in_stock.delete()
+    assert not models.LowStockProduct.objects.exists()
+    assert not models.LowStockVariant.objects.exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_low_stock_of_concurrent_allocations(product_in_stock):
+    sibling = ProductVariant.objects.create(
+        product=product_in_stock, sku='456')
+    Stock.objects.create(
+        variant=sibling, quantity=5,
+        location=StockLocation.objects.get(name='Warehouse 3'))
+    stocks = [
+        variant.select_stockrecord()
+        for variant in product_in_stock.variants.prefetch_related('stock')]
+    barrier = threading.Barrier(len(stocks))
+    errors = []
+
+    def allocate(stock):
+        try:
+            with transaction.atomic():
+                # Both allocations run while the other one is not committed
+                Stock.objects.select_for_update().get(pk=stock.pk)
+                barrier.wait(timeout=10)
+                allocate_stocks({stock.pk: 1})
+        except Exception as error:  # pylint: disable=W0703
+            errors.append(error)
+        finally:
+            connection.close()
+
+    threads = [
+        threading.Thread(target=allocate, args=(stock,)) for stock in stocks]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert get_low_stock_products().get().total_stock == 8
+    assert sorted(models.LowStockVariant.objects.values_list(
+        'quantity_available', flat=True)) == [4, 4]
+
+
 def test_product_page_redirects_to_correct_slug(client, product_in_stock):
     uri = product_in_stock.get_absolute_url()
     uri = uri.replace(product_in_stock.get_slug(), 'spanish-inquisition')
@@ -112,6 +246,78 @@ def test_availability(product_in_stock, monkeypatch, settings):
     assert availability.available
 
 
+def test_product_pricing_is_maintained(product_in_stock):
+    pricing = models.ProductPricing.objects.get(product=product_in_stock)
+    assert pricing.price_range == product_in_stock.get_price_range()
+    assert pricing.is_in_stock
+    variant = product_in_stock.variants.get()
+    variant.price_override = 25
+    variant.save()
+    pricing.refresh_from_db()
+    assert pricing.price_max.gross == 25
+    variant.stock.update(quantity_allocated=0, quantity=0)
+    variant.stock.first().save()
+    pricing.refresh_from_db()
+    assert not pricing.is_in_stock
+
+
+@pytest.mark.django_db(transaction=True)
+def test_product_pricing_follows_variant_and_product_delete(variant_list):
+    variant = variant_list[0]
+    variant.price_override = 25
+    variant.save()
+    pricing = models.ProductPricing.objects.get(product=variant.product_id)
+    assert pricing.price_max.gross == 25
+    variant.delete()
+    pricing.refresh_from_db()
+    assert pricing.price_max.gross == 10
+
+    deleted_variant = variant_list[1]
+    deleted_variant.product.delete()
+    assert not models.ProductPricing.objects.filter(
+        product=deleted_variant.product_id).exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_product_pricing_follows_sales(product_in_stock):
+    sale = Sale.objects.create(name='Sale', value=5)
+    sale.products.add(product_in_stock)
+    pricing = models.ProductPricing.objects.get(product=product_in_stock)
+    assert pricing.discounted_price_min.gross == 5
+    sale.products.remove(product_in_stock)
+    pricing.refresh_from_db()
+    assert pricing.discounted_price_min.gross == 10
+
+
+def test_availability_from_pricing(product_in_stock, sale):
+    update_products_pricing(Product.objects.all())
+    product = Product.objects.select_related('pricing').get()
+    availability = get_availability_from_pricing(product, product.pricing)
+    expected = get_availability(product, discounts=Sale.objects.all())
+    assert availability.price_range == expected.price_range
+    assert availability.price_range_undiscounted == (
+        expected.price_range_undiscounted)
+    assert availability.available == expected.available
+    assert availability.discount == expected.discount
+
+
+@pytest.mark.parametrize('discount_type, value', [
+    (DiscountValueType.FIXED, 15), (DiscountValueType.PERCENTAGE, 33)])
+def test_variants_prices_match_per_item_pricing(
+        product_in_stock, sale, discount_type, value):
+    sale.type = discount_type
+    sale.value = value
+    sale.save()
+    variants = list(ProductVariant.objects.select_related('product__category'))
+    discounts = Sale.objects.all()
+    variants_prices = get_variants_prices(variants, discounts=discounts)
+    for variant, prices in zip(variants, variants_prices):
+        price = variant.get_price_per_item(discounts)
+        assert prices.price == price
+        assert prices.price_undiscounted == variant.get_price_per_item()
+        assert prices.taxed_price == get_tax_price(total=price)[0]
+
+
 def test_get_availability_range(product_in_stock: Product, client):
     variant = product_in_stock.variants.first()  # type: ProductVariant
     stock = variant.stock.first()  # type: Stock
@@ -220,6 +426,103 @@ def test_filtering_by_attribute(db, color_attribute, default_category):
     assert product_b not in list(filtered)
 
 
+def test_attributes_lookup_uses_containment(product_in_stock):
+    product_type = product_in_stock.product_type
+    product_attribute = product_type.product_attributes.get()
+    product_value = product_in_stock.attributes[smart_text(
+        product_attribute.pk)]
+    products = models.Product.objects.filter(
+        get_attributes_lookup({product_attribute.pk: [product_value]}))
+    assert list(products) == [product_in_stock]
+    # Product attributes are matched without querying variants
+    assert models.ProductVariant._meta.db_table not in str(products.query)
+
+    variant_attribute = product_type.variant_attributes.get()
+    variant = product_in_stock.variants.get()
+    variant_value = variant.attributes[smart_text(variant_attribute.pk)]
+    products = models.Product.objects.filter(get_attributes_lookup({
+        product_attribute.pk: [product_value],
+        variant_attribute.pk: [variant_value, '0']}))
+    assert list(products) == [product_in_stock]
+
+
+def test_product_page_is_cached_for_anonymous_users(
+        client, product_in_stock, settings):
+    settings.ENABLE_PAGE_CACHE = True
+    url = product_in_stock.get_absolute_url()
+    response = client.get(url)
+    assert response.status_code == 200
+    assert CSRF_TOKEN_PLACEHOLDER.encode('utf-8') not in response.content
+    assert CART_COUNTER_PLACEHOLDER.encode('utf-8') not in response.content
+
+    # Bulk updates do not send signals, so the cached page is served
+    models.Product.objects.filter(pk=product_in_stock.pk).update(
+        name='Renamed product')
+    response = client.get(url)
+    assert b'Renamed product' not in response.content
+
+    product_in_stock.name = 'Renamed product'
+    product_in_stock.save()
+    response = client.get(product_in_stock.get_absolute_url())
+    assert b'Renamed product' in response.content
+
+
+def test_product_page_is_revalidated_with_validators(
+        client, product_in_stock):
+    url = product_in_stock.get_absolute_url()
+    # The first response sets the CSRF cookie the page depends on
+    client.get(url)
+    response = client.get(url)
+    assert response.status_code == 200
+    assert not response.has_header('Last-Modified')
+    etag = response['ETag']
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response.content == b''
+
+    stock = product_in_stock.variants.get().stock.first()
+    increase_stock(stock, 5)
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+
+
+def test_product_cards_are_cached(product_in_stock):
+    products = [(product_in_stock, get_availability(product_in_stock))]
+    cards = get_product_cards(products, 'product/_item.html')
+    assert len(cards) == 1
+    assert smart_text(product_in_stock) in cards[0]
+
+    # Bulk updates do not send signals, so the cached card is served
+    models.Product.objects.filter(pk=product_in_stock.pk).update(
+        name='Renamed product')
+    product_in_stock.name = 'Renamed product'
+    assert get_product_cards(products, 'product/_item.html') == cards
+
+    product_in_stock.save()
+    cards = get_product_cards(products, 'product/_item.html')
+    assert 'Renamed product' in cards[0]
+
+
+def test_product_details_fit_query_budget(
+        product_in_stock, sale, admin_user, django_assert_num_queries):
+    discounts = get_sale_index()
+    # Warm up the attribute registry and the variant picker structure
+    get_product_details(
+        get_product_with_details(admin_user, product_in_stock.pk), discounts)
+    with django_assert_num_queries(PRODUCT_DETAILS_QUERY_BUDGET):
+        product = get_product_with_details(admin_user, product_in_stock.pk)
+        details = get_product_details(product, discounts)
+    variant = product.variants.get()
+    variant_prices = details.variants_prices[variant.pk]
+    assert variant_prices.price == variant.get_price_per_item(discounts)
+    assert details.availability.price_range == product.get_price_range(
+        discounts)
+    assert details.json_ld_data['offers'][0]['price'] == (
+        variant_prices.price_undiscounted.gross)
+
+
 def test_view_invalid_add_to_cart(client, product_in_stock, request_cart):
     variant = product_in_stock.variants.get()
     request_cart.add(variant, 2)
@@ -391,6 +694,80 @@ def test_get_attributes_display_map_no_choices(product_in_stock):
     assert attributes_display_map == {product_attr.pk: smart_text(-1)}
 
 
+def test_display_variant_attributes_uses_registry(
+        product_in_stock, django_assert_num_queries):
+    variant = product_in_stock.variants.get()
+    attribute = product_in_stock.product_type.variant_attributes.get()
+    value = attribute.values.get(pk=variant.get_attribute(attribute.pk))
+    get_attribute_registry()
+    with django_assert_num_queries(0):
+        assert variant.display_variant_attributes() == '%s: %s' % (
+            attribute.name, value.name)
+    value.name = 'Renamed'
+    value.save()
+    assert variant.display_variant_attributes() == '%s: Renamed' % (
+        attribute.name,)
+
+
+def test_variant_display_name_follows_value_rename(product_in_stock):
+    variant = product_in_stock.variants.get()
+    attribute = product_in_stock.product_type.variant_attributes.get()
+    value = attribute.values.get(pk=variant.get_attribute(attribute.pk))
+    assert variant.display_name == '%s: %s' % (attribute.name, value.name)
+    value.name = 'Renamed'
+    value.save()
+    variant.refresh_from_db()
+    assert variant.display_name == '%s: Renamed' % (attribute.name,)
+
+
+def test_product_slug_is_stored(product_in_stock):
+    product_in_stock.name = 'Żółta Koszulka'
+    product_in_stock.save()
+    product = Product.objects.only('pk', 'slug').get(pk=product_in_stock.pk)
+    assert product.slug == 'zolta-koszulka'
+
+
+def test_category_urls_use_tree_snapshot(
+        default_category, django_assert_num_queries):
+    child = Category.objects.create(
+        name='Child', slug='child', parent=default_category)
+    tree = get_category_tree()
+    assert tree.get_ancestors(child.pk) == [default_category]
+    assert tree.get_children(default_category.pk) == [child]
+    assert tree.get_depth(child.pk) == 1
+    with django_assert_num_queries(0):
+        assert child.get_full_path() == '%s/child' % (default_category.slug,)
+    default_category.slug = 'renamed'
+    default_category.save()
+    assert child.get_absolute_url() == reverse(
+        'product:category',
+        kwargs={'path': 'renamed/child', 'category_id': child.pk})
+
+
+def test_facets_of_category_listing(
+        product_in_stock, default_category, django_assert_num_queries):
+    products = models.Product.objects.filter(category=default_category)
+    product_type = product_in_stock.product_type
+    definitions = get_facet_definitions('category:test', products)
+    with django_assert_num_queries(0):
+        assert get_facet_definitions('category:test', products) == definitions
+    product_attribute = product_type.product_attributes.get()
+    variant_attribute = product_type.variant_attributes.get()
+    assert definitions.product_attribute_pks == [product_attribute.pk]
+    assert definitions.variant_attribute_pks == [variant_attribute.pk]
+
+    variant = product_in_stock.variants.get()
+    product_value = product_in_stock.attributes[smart_text(
+        product_attribute.pk)]
+    variant_value = variant.attributes[smart_text(variant_attribute.pk)]
+    with django_assert_num_queries(1):
+        counts = get_facet_counts(products)
+    assert counts[
+        PRODUCT_FACET, product_attribute.pk, int(product_value)] == 1
+    assert counts[
+        VARIANT_FACET, variant_attribute.pk, int(variant_value)] == 1
+
+
 def test_product_availability_status(unavailable_product):
     product = unavailable_product
     product.product_type.has_variants = True
@@ -512,17 +889,34 @@ def test_product_leaf_category(
         assert _resp.status_code == 200
         return _resp
 
-    # non-leaf category (no products must be returned)
+    products = models.Product.objects.all().filter(
+        category__name=default_category).order_by('-price')
+
+    # non-leaf category (products of descendants must be returned)
     response = _get_products(root_category)
-    assert 'filter_set' not in response.context
+    assert list(products) == list(response.context['filter_set'].qs)
 
     # leaf category (products must be returned)
-    products = models.Product.objects.all().filter(
-        category__name=default_category).order_by('-price')
     response = _get_products(default_category)
     assert list(products) == list(response.context['filter_set'].qs)
 
 
+def test_category_product_counts_cover_descendants(
+        product_in_stock, default_category):
+    root_category = Category.objects.create(name='root', slug='root')
+    default_category.move_to(root_category)
+    update_categories_product_counts()
+    counts = models.CategoryProductCount.objects.get(category=root_category)
+    assert counts.direct_products_count == 0
+    assert counts.total_products_count == 1
+
+    product_in_stock.is_published = False
+    product_in_stock.save()
+    counts = get_categories_product_counts(
+        [root_category.pk, default_category.pk])
+    assert counts == {root_category.pk: 0, default_category.pk: 0}
+
+
 def test_product_filter_before_filtering(
         authorized_client, product_in_stock, default_category):
     products = models.Product.objects.all().filter(
@@ -604,6 +998,19 @@ def test_get_variant_picker_data_proper_variant_count(product_in_stock):
     assert len(data['variantAttributes'][0]['values']) == 1
 
 
+def test_variant_picker_structure_is_cached(
+        product_in_stock, django_assert_num_queries):
+    structure = get_variant_picker_structure(product_in_stock)
+    assert structure['variants'][0]['availability']
+    with django_assert_num_queries(0):
+        assert get_variant_picker_structure(product_in_stock) == structure
+    variant = product_in_stock.variants.get()
+    allocate_stock(variant.stock.get(), variant.get_stock_quantity())
+    product = Product.objects.get(pk=product_in_stock.pk)
+    structure = get_variant_picker_structure(product)
+    assert not structure['variants'][0]['availability']
+
+
 def test_view_ajax_available_variants_list(admin_client, product_in_stock):
     variant = product_in_stock.variants.first()
     variant_list = [